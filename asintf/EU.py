@@ -1,16 +1,21 @@
 from functools import cached_property
-from typing import List, Union, Tuple
+from typing import List, Tuple, Union
 
-from numpy import einsum, einsum_path
-from numpy.linalg import norm
+from numpy import einsum, ndarray
 
 from asintf.NTFBase import NTFBase
+from asintf.stft import number_of_channels_to_packed_size, pack_covariance_matrices, packed_trace_weights
 
 
 class EU(NTFBase):
     """
     Non-negative Tensor Factorization with Ambisonic Spatial Covariance Matrix Model, based on Euclidean distance [1].
 
+    The updates and the cost function are evaluated from the traces of R against XI and from the Gram matrix of XI,
+    i.e., tr(hatR_ft XI_j) = sum_i V_ift tr(XI_i XI_j), hence hatR is only formed on request. The traces against R
+    are taken over the packed upper triangles, see stft.packed_trace_weights, and the imaginary parts of R only enter
+    its norms.
+
     References
     ----------
     [1] J. Nikunen and A. Politis, "Multichannel NMF for Source Separation with Ambisonic Signals", 2018 16th
@@ -21,47 +26,109 @@ class EU(NTFBase):
     -----
     The documentation only covers changes introduced in this class - for further description see the base class.
     """
+    _shared_names = NTFBase._shared_names + ('_packed_S', '_trRR', '_trace_weights')
+    _derived_names = NTFBase._derived_names + ('_packed_XI', '_trRXI')
+    _tensors = dict({name: dimensions for name, dimensions in NTFBase._tensors.items() if name != '_hatR'},
+                    _packed_S='DP', _packed_XI='JP', _trRR='FT', _trRXI='JFT')
 
     def update_Q(self):
-        q_n = einsum('fk, tk, ftab, jab -> jk', self._W, self._H, self._R, self._XI, optimize=self._Q_path)
-        q_d = einsum('fk, tk, ftab, jab -> jk', self._W, self._H, self._hatR.sum(0), self._XI, optimize=self._Q_path)
-        self._Q *= (q_n / q_d).real
+        q_n, q_d = self._sum_frequency_blocks(self._Q_terms)
+        self._Q *= self._update_ratio(q_n, q_d)
         super().update_Q()
 
     def update_W(self):
-        w_n = einsum('jk, tk, ftab, jab -> fk', self._Q, self._H, self._R, self._XI, optimize=self._W_path)
-        w_d = einsum('jk, tk, ftab, jab -> fk', self._Q, self._H, self._hatR.sum(0), self._XI, optimize=self._W_path)
-        self._W *= (w_n / w_d).real
+        w_n, w_d = self._concatenate_frequency_blocks(self._W_terms, axis=0)
+        self._W *= self._update_ratio(w_n, w_d)
         super().update_W()
 
     def update_H(self):
-        h_n = einsum('jk, fk, ftab, jab -> tk', self._Q, self._W, self._R, self._XI, optimize=self._H_path)
-        h_d = einsum('jk, fk, ftab, jab -> tk', self._Q, self._W, self._hatR.sum(0), self._XI, optimize=self._H_path)
-        self._H *= (h_n / h_d).real
+        h_n, h_d = self._sum_frequency_blocks(self._H_terms)
+        self._H *= self._update_ratio(h_n, h_d)
         super().update_H()
 
     def update_Z(self):
-        z_n = einsum('jft, ftab, dab -> jd', self._V, self._R, self._S, optimize=self._Z_path)
-        z_d = einsum('jft, ftab, dab -> jd', self._V, self._hatR.sum(0), self._S, optimize=self._Z_path)
-        self._Z *= (z_n / z_d).real
+        z_n, z_d = self._sum_frequency_blocks(self._Z_terms)
+        self._Z *= self._update_ratio(z_n, z_d)
         super().update_Z()
 
+    def _calculate_XI(self) -> None:
+        super()._calculate_XI()
+        self._reset_cached_properties('_packed_XI', '_trRXI')
+
+    def _calculate_hatR(self) -> None:
+        pass
+
+    def _reset_direction_dependent_properties(self) -> None:
+        super()._reset_direction_dependent_properties()
+        self._reset_cached_properties('_packed_S')
+
+    def _reset_grid_dependent_properties(self) -> None:
+        super()._reset_grid_dependent_properties()
+        self._reset_cached_properties('_trRR', '_trRXI')
+
+    def _gram_matrix(self, f: slice) -> ndarray:
+        c = self._channels(f)
+        return einsum('iab, jab -> ij', self._XI[:, c, c], self._XI[:, c, c])
+
+    def _off_diagonal_channels(self, f: slice) -> slice:
+        number_of_channels = self._channel_limits[f.start]
+        return slice(0, number_of_channels_to_packed_size(number_of_channels) - number_of_channels)
+
+    def _XI_traces(self, f: slice) -> Tuple[ndarray, ndarray]:
+        return self._trRXI[:, f], einsum('ift, ij -> jft', self._V[:, f], self._gram_matrix(f))
+
+    def _Z_terms(self, f: slice) -> Tuple[ndarray, ndarray]:
+        c, p = self._channels(f), self._packed_channels(f)
+        z_n = einsum('jft, ftp, dp -> jd', self._V[:, f], self._R[f, :, p], self._packed_S[:, p],
+                     optimize=self._Z_path[0])
+        z_d = einsum('jft, ift -> ji', self._V[:, f], self._V[:, f]) @ einsum(
+            'iab, dab -> id', self._XI[:, c, c], self._S[:, c, c])
+        return z_n, z_d
+
+    def _cost_terms(self, f: slice) -> Tuple[float]:
+        return (self._trRR[f].sum() - 2 * einsum('jft, jft ->', self._V[:, f], self._trRXI[:, f]) +
+                einsum('ift, ij, jft ->', self._V[:, f], self._gram_matrix(f), self._V[:, f])),
+
+    @property
+    def covariance_matrices(self) -> ndarray:
+        return einsum('jft, jab -> jftab', self._V, self._XI, optimize=self._covariance_matrices_path)
+
     @property
     def cost_function(self) -> float:
-        return (norm(self._R - self._hatR.sum(0), axis=(-1, -2)) ** 2).mean().real
+        return self._sum_frequency_blocks(self._cost_terms)[0] / (self._F * self._T)
+
+    @cached_property
+    def _packed_S(self) -> ndarray:
+        return pack_covariance_matrices(self._S) * self._trace_weights
+
+    @cached_property
+    def _packed_XI(self) -> ndarray:
+        return pack_covariance_matrices(self._XI) * self._trace_weights
+
+    @cached_property
+    def _trace_weights(self) -> ndarray:
+        return packed_trace_weights(self._L)
+
+    @cached_property
+    def _trRR(self) -> ndarray:
+        return self._concatenate_frequency_blocks(lambda f: (
+            self._R[f, :, self._packed_channels(f)] ** 2 @ self._trace_weights[self._packed_channels(f)] +
+            2 * (self._R_imag[f, :, self._off_diagonal_channels(f)] ** 2).sum(axis=-1),), axis=0)[0]
 
     @cached_property
-    def _H_path(self) -> List[Union[str, Tuple[int]]]:
-        return einsum_path('jk, fk, ftab, jab -> tk', self._Q, self._W, self._R, self._XI, optimize='optimal')[0]
+    def _trRXI(self) -> ndarray:
+        return self._concatenate_frequency_blocks(lambda f: (einsum(
+            'ftp, jp -> jft', self._R[f, :, self._packed_channels(f)],
+            self._packed_XI[:, self._packed_channels(f)], optimize=self._XI_trace_path),), axis=1)[0]
 
     @cached_property
-    def _Q_path(self) -> List[Union[str, Tuple[int]]]:
-        return einsum_path('fk, tk, ftab, jab -> jk', self._W, self._H, self._R, self._XI, optimize='optimal')[0]
+    def _XI_trace_path(self) -> List[Union[str, Tuple[int]]]:
+        return self._einsum_path('ftp, jp -> jft', self._R, self._packed_XI)
 
     @cached_property
-    def _W_path(self) -> List[Union[str, Tuple[int]]]:
-        return einsum_path('jk, tk, ftab, jab -> fk', self._Q, self._H, self._R, self._XI, optimize='optimal')[0]
+    def _Z_path(self) -> List[List[Union[str, Tuple[int]]]]:
+        return [self._einsum_path('jft, ftp, dp -> jd', self._V, self._R, self._packed_S)]
 
     @cached_property
-    def _Z_path(self) -> List[Union[str, Tuple[int]]]:
-        return einsum_path('jft, ftab, dab -> jd', self._V, self._R, self._S, optimize='optimal')[0]
+    def _covariance_matrices_path(self) -> List[Union[str, Tuple[int]]]:
+        return self._einsum_path('jft, jab -> jftab', self._V, self._XI)
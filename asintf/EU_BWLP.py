@@ -35,7 +35,7 @@ class EU_BWLP(EU_WLP):
             stft, directions_of_arrival_cartesian)
         degrees_of_freedom = self._estimate_degrees_of_freedom(stft, direct_to_reverb_ratio,
                                                                directions_of_arrival_cartesian)
-        covariance_matrices = estimate_covariance_matrices(stft)
+        covariance_matrices = estimate_covariance_matrices(stft, packed=True)
         super().__init__(covariance_matrices, number_of_sources, components_per_source, number_of_directions,
                          standard_deviation, directions_of_arrival_cartesian, direct_to_reverb_ratio,
                          degrees_of_freedom, random_generator)
@@ -2,16 +2,16 @@ from copy import deepcopy
 from functools import cached_property
 from typing import Optional
 
-from numpy import einsum, einsum_path, empty, log, ndarray, pi, sqrt, trace
+from numpy import einsum, empty, log, ndarray, pi, sqrt, trace
 from numpy.linalg import det, norm, pinv
 from numpy.random import Generator
 
 from asintf.EU import EU
 from asintf.NTFBase import NTFBase
-from asintf.PriorBase import PriorBase
+from asintf.PriorBase import EUPriorBase
 
 
-class EU_IWLP(EU, PriorBase):
+class EU_IWLP(EU, EUPriorBase):
     """
     Non-negative Tensor Factorization with Ambisonic Spatial Covariance Matrix Model and Inverse Wishart Localization
     Prior, based on Euclidean distance [1].
@@ -25,6 +25,7 @@ class EU_IWLP(EU, PriorBase):
     -----
     The documentation only covers changes introduced in this class - for further description see the base class.
     """
+    _state_names = EU._state_names + ('_std', '_doa', '_dtrr', '_nu')
 
     def __init__(self, covariance_matrices: ndarray, number_of_sources: int, components_per_source: int,
                  number_of_directions: int, standard_deviation, cartesian_coordinates: ndarray,
@@ -45,7 +46,9 @@ class EU_IWLP(EU, PriorBase):
         super().__init__(
             covariance_matrices, number_of_sources, components_per_source, number_of_directions, random_generator)
         # 0th order magnitude normalization to ensure constant prior strength
-        self._R /= norm(sqrt(self._R[..., 0, 0].real))[..., None, None] ** 2
+        scale = norm(sqrt(self._R[..., 0])) ** 2
+        self._R /= scale
+        self._R_imag /= scale
         self._std = standard_deviation
         self._doa = deepcopy(cartesian_coordinates)
         self._dtrr = direct_to_reverb_ratio
@@ -53,14 +56,14 @@ class EU_IWLP(EU, PriorBase):
 
     def update_Z(self) -> None:
         XIinv = pinv(self._XI)
-        z_n = einsum('jft, ftab, dab -> jd', self._V, self._R, self._S, optimize=self._Z_path[0])
-        z_d = einsum('jft, ftab, dab -> jd', self._V, self._hatR.sum(0), self._S, optimize=self._Z_path[0])
+        z_n, z_d = self._sum_frequency_blocks(self._Z_terms)
         trXIinvS = einsum('jab, dab -> jd', XIinv, self._S, optimize=self._Z_path[1])
         trPsiXIinvSXIinv = trace(einsum('jab, jbc, dce, jeg -> jdag', self._Psi, XIinv, self._S, XIinv,
                                         optimize=self._Z_path[2]), axis1=-2, axis2=-1)
-        self._Z *= ((2 * z_n / (self._F * self._T * pi * self._std ** 2) + self._nu * trPsiXIinvSXIinv) /
-                    (2 * z_d / (self._F * self._T * pi * self._std ** 2) + self._L * trPsiXIinvSXIinv +
-                     (self._nu + self._L) * trXIinvS)).real
+        self._Z *= self._update_ratio(
+            2 * z_n / (self._F * self._T * pi * self._std ** 2) + self._nu * trPsiXIinvSXIinv,
+            2 * z_d / (self._F * self._T * pi * self._std ** 2) + self._L * trPsiXIinvSXIinv +
+            (self._nu + self._L) * trXIinvS)
         NTFBase.update_Z(self)
 
     @property
@@ -75,10 +78,8 @@ class EU_IWLP(EU, PriorBase):
 
     @cached_property
     def _Z_path(self):
-        Z_path = [
-            super()._Z_path,
-            einsum_path('jab, dab -> jd', empty((self._J, self._L, self._L)), self._S, optimize='optimal')[0],
-            einsum_path('jab, jbc, dce, jeg -> jdag', self._Psi, empty((self._J, self._L, self._L)), self._S,
-                        empty((self._J, self._L, self._L)), optimize='optimal')[0]
-        ]
+        Z_path = super()._Z_path
+        Z_path.append(self._einsum_path('jab, dab -> jd', empty((self._J, self._L, self._L)), self._S))
+        Z_path.append(self._einsum_path('jab, jbc, dce, jeg -> jdag', self._Psi, empty((self._J, self._L, self._L)),
+                                        self._S, empty((self._J, self._L, self._L))))
         return Z_path
@@ -2,16 +2,16 @@ from copy import deepcopy
 from functools import cached_property
 from typing import List, Optional, Tuple, Union
 
-from numpy import einsum, einsum_path, empty, log, ndarray, pi, sqrt, trace
+from numpy import einsum, empty, log, ndarray, pi, sqrt, trace
 from numpy.linalg import det, norm, pinv
 from numpy.random import Generator
 
 from asintf.EU import EU
 from asintf.NTFBase import NTFBase
-from asintf.PriorBase import PriorBase
+from asintf.PriorBase import EUPriorBase
 
 
-class EU_WLP(EU, PriorBase):
+class EU_WLP(EU, EUPriorBase):
     """
     Non-negative Tensor Factorization with Ambisonic Spatial Covariance Matrix Model and Wishart Localization Prior,
     based on Euclidean distance [1], [2].
@@ -29,6 +29,7 @@ class EU_WLP(EU, PriorBase):
     -----
     The documentation only covers changes introduced in this class - for further description see the base class.
     """
+    _state_names = EU._state_names + ('_std', '_doa', '_dtrr', '_nu')
 
     def __init__(self, covariance_matrices: ndarray, number_of_sources: int, components_per_source: int,
                  number_of_directions: int, standard_deviation, directions_of_arrival_cartesian: ndarray,
@@ -49,21 +50,26 @@ class EU_WLP(EU, PriorBase):
         super().__init__(
             covariance_matrices, number_of_sources, components_per_source, number_of_directions, random_generator)
         # 0th order magnitude normalization to ensure constant prior strength
-        self._R /= norm(sqrt(self._R[..., 0, 0].real))[..., None, None] ** 2
+        scale = norm(sqrt(self._R[..., 0])) ** 2
+        self._R /= scale
+        self._R_imag /= scale
         self._std = standard_deviation
         self._doa = deepcopy(directions_of_arrival_cartesian)
         self._dtrr = direct_to_reverb_ratio
         self._nu = degrees_of_freedom
 
     def update_Z(self) -> None:
-        zn = einsum('jft, ftab, dab -> jd', self._V, self._R, self._S, optimize=self._Z_path[0])
-        zd = einsum('jft, ftab, dab -> jd', self._V, self._hatR.sum(0), self._S, optimize=self._Z_path[0])
+        zn, zd = self._sum_frequency_blocks(self._Z_terms)
         trXIinvS = einsum('jab, dab -> jd', pinv(self._XI), self._S, optimize=self._Z_path[1])
-        self._Z *= ((2 * zn / (self._F * self._T * pi * self._std ** 2) + self._nu * trXIinvS) /
-                    (2 * zd / (self._F * self._T * pi * self._std ** 2) + self._L * trXIinvS +
-                     self._nu * self._trPsiinvS)).real
+        self._Z *= self._update_ratio(2 * zn / (self._F * self._T * pi * self._std ** 2) + self._nu * trXIinvS,
+                                      2 * zd / (self._F * self._T * pi * self._std ** 2) + self._L * trXIinvS +
+                                      self._nu * self._trPsiinvS)
         NTFBase.update_Z(self)
 
+    def _reset_direction_dependent_properties(self) -> None:
+        super()._reset_direction_dependent_properties()
+        self._reset_cached_properties('_trPsiinvS')
+
     @property
     def cost_function(self) -> float:
         return ((pi * self._std ** 2) ** (-1) * super().cost_function +
@@ -84,8 +90,6 @@ class EU_WLP(EU, PriorBase):
 
     @cached_property
     def _Z_path(self) -> List[List[Union[str, Tuple[int]]]]:
-        Z_path = [
-            super()._Z_path,
-            einsum_path('jab, dab -> jd', empty((self._J, self._L, self._L)), self._S, optimize='optimal')[0]
-        ]
+        Z_path = super()._Z_path
+        Z_path.append(self._einsum_path('jab, dab -> jd', empty((self._J, self._L, self._L)), self._S))
         return Z_path
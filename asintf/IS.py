@@ -1,9 +1,10 @@
-from functools import cached_property
+from typing import Tuple
 
-from numpy import einsum, einsum_path, empty, log, trace
+from numpy import einsum, log, ndarray, trace
 from numpy.linalg import det, pinv
 
 from asintf.NTFBase import NTFBase
+from asintf.stft import unpack_covariance_matrices
 
 
 class IS(NTFBase):
@@ -23,81 +24,48 @@ class IS(NTFBase):
     """
 
     def update_Q(self):
-        hatRinv = pinv(self._hatR.sum(0))
-        q_n = trace(einsum('fk, tk, ftab, ftbc, ftce, jeg -> jkag', self._W, self._H, hatRinv, self._R, hatRinv,
-                           self._XI, optimize=self._Q_path[0]), axis1=-1, axis2=-2)
-        q_d = einsum('fk, tk, ftab, jab -> jk', self._W, self._H, hatRinv, self._XI, optimize=self._Q_path[1])
-        self._Q *= (q_n / q_d).real
+        q_n, q_d = self._sum_frequency_blocks(self._Q_terms)
+        self._Q *= self._update_ratio(q_n, q_d)
         super().update_Q()
 
     def update_W(self):
-        hatRinv = pinv(self._hatR.sum(0))
-        w_n = trace(einsum('jk, tk, ftab, ftbc, ftce, jeg -> fkag', self._Q, self._H, hatRinv, self._R, hatRinv,
-                           self._XI, optimize=self._W_path[0]), axis1=-1, axis2=-2)
-        w_d = einsum('jk, tk, ftab, jab -> fk', self._Q, self._H, hatRinv, self._XI, optimize=self._W_path[1])
-        self._W *= (w_n / w_d).real
+        w_n, w_d = self._concatenate_frequency_blocks(self._W_terms, axis=0)
+        self._W *= self._update_ratio(w_n, w_d)
         super().update_W()
 
     def update_H(self):
-        hatRinv = pinv(self._hatR.sum(0))
-        h_n = trace(einsum('jk, fk, ftab, ftbc, ftce, jeg -> tkag', self._Q, self._W, hatRinv, self._R, hatRinv,
-                           self._XI, optimize=self._H_path[0]), axis1=-1, axis2=-2)
-        h_d = einsum('jk, fk, ftab, jab -> tk', self._Q, self._W, hatRinv, self._XI, optimize=self._H_path[1])
-        self._H *= (h_n / h_d).real
+        h_n, h_d = self._sum_frequency_blocks(self._H_terms)
+        self._H *= self._update_ratio(h_n, h_d)
         super().update_H()
 
     def update_Z(self):
-        hatRinv = pinv(self._hatR.sum(0))
-        z_n = trace(einsum('jft, ftab, ftbc, ftce, deg -> jdag', self._V, hatRinv, self._R, hatRinv, self._S,
-                           optimize=self._Z_path[0]), axis1=-1, axis2=-2)
-        z_d = einsum('jft, ftab, dab -> jd', self._V, hatRinv, self._S, optimize=self._Z_path[1])
-        self._Z *= (z_n / z_d).real
+        z_n, z_d = self._sum_frequency_blocks(self._Z_terms)
+        self._Z *= self._update_ratio(z_n, z_d)
         super().update_Z()
 
+    def _XI_traces(self, f: slice) -> Tuple[ndarray, ndarray]:
+        c, p = self._channels(f), self._packed_channels(f)
+        hatRinv = pinv(unpack_covariance_matrices(self._hatR[:, f, :, p].sum(0)))
+        R = unpack_covariance_matrices(self._R[f, :, p])
+        return (einsum('ftab, jab -> jft', hatRinv @ R @ hatRinv, self._XI[:, c, c],
+                       optimize=self._XI_trace_path),
+                einsum('ftab, jab -> jft', hatRinv, self._XI[:, c, c], optimize=self._XI_trace_path))
+
+    def _Z_terms(self, f: slice) -> Tuple[ndarray, ndarray]:
+        c, p = self._channels(f), self._packed_channels(f)
+        hatRinv = pinv(unpack_covariance_matrices(self._hatR[:, f, :, p].sum(0)))
+        R = unpack_covariance_matrices(self._R[f, :, p])
+        z_n = einsum('jft, ftab, dab -> jd', self._V[:, f], hatRinv @ R @ hatRinv, self._S[:, c, c],
+                     optimize=self._Z_path[0])
+        z_d = einsum('jft, ftab, dab -> jd', self._V[:, f], hatRinv, self._S[:, c, c], optimize=self._Z_path[0])
+        return z_n, z_d
+
+    def _cost_terms(self, f: slice) -> Tuple[float]:
+        p = self._packed_channels(f)
+        hatR = unpack_covariance_matrices(self._hatR[:, f, :, p].sum(0))
+        R = unpack_covariance_matrices(self._R[f, :, p])
+        return (trace(R @ pinv(hatR), axis1=-1, axis2=-2) + log(det(hatR))).sum(),
+
     @property
     def cost_function(self) -> float:
-        return (trace(self._R @ pinv(self._hatR.sum(0)), axis1=-1, axis2=-2) + log(det(self._hatR.sum(0)))).mean().real
-
-    @cached_property
-    def _H_path(self):
-        H_path = [
-            einsum_path('jk, fk, ftab, ftbc, ftce, jeg -> tkag', self._Q, self._W,
-                        empty((self._F, self._T, self._L, self._L)), self._R,
-                        empty((self._F, self._T, self._L, self._L)), self._XI, optimize='optimal')[0],
-            einsum_path('jk, fk, ftab, jab -> tk', self._Q, self._W, empty((self._F, self._T, self._L, self._L)),
-                        self._XI, optimize='optimal')[0]
-        ]
-        return H_path
-
-    @cached_property
-    def _Q_path(self):
-        Q_path = [
-            einsum_path('fk, tk, ftab, ftbc, ftce, jeg -> jkag', self._W, self._H,
-                        empty((self._F, self._T, self._L, self._L)), self._R,
-                        empty((self._F, self._T, self._L, self._L)), self._XI, optimize='optimal')[0],
-            einsum_path('fk, tk, ftab, jab -> jk', self._W, self._H, empty((self._F, self._T, self._L, self._L)),
-                        self._XI, optimize='optimal')[0]
-        ]
-        return Q_path
-
-    @cached_property
-    def _W_path(self):
-        W_path = [
-            einsum_path('jk, tk, ftab, ftbc, ftce, jeg -> fkag', self._Q, self._H,
-                        empty((self._F, self._T, self._L, self._L)), self._R,
-                        empty((self._F, self._T, self._L, self._L)), self._XI, optimize='optimal')[0],
-            einsum_path('jk, tk, ftab, jab -> fk', self._Q, self._H, empty((self._F, self._T, self._L, self._L)),
-                        self._XI, optimize='optimal')[0]
-        ]
-        return W_path
-
-
-    @cached_property
-    def _Z_path(self):
-        Z_path = [
-            einsum_path('jft, ftab, ftab, ftab, dab -> jd', self._V, empty((self._F, self._T, self._L, self._L)),
-                        self._R, empty((self._F, self._T, self._L, self._L)), self._S, optimize='optimal')[0],
-            einsum_path('jft, ftab, dab -> jd', self._V, empty((self._F, self._T, self._L, self._L)), self._S,
-                        optimize='optimal')[0]
-        ]
-        return Z_path
+        return self._sum_frequency_blocks(self._cost_terms)[0] / (self._F * self._T)
@@ -2,7 +2,7 @@ from copy import deepcopy
 from functools import cached_property
 from typing import Optional
 
-from numpy import einsum, einsum_path, empty, log, ndarray, sqrt, trace
+from numpy import einsum, empty, log, ndarray, sqrt, trace
 from numpy.linalg import det, norm, pinv
 from numpy.random import Generator
 
@@ -25,6 +25,7 @@ class IS_IWLP(IS, PriorBase):
     -----
     The documentation only covers changes introduced in this class - for further description see the base class.
     """
+    _state_names = IS._state_names + ('_doa', '_dtrr', '_nu')
 
     def __init__(self, covariance_matrices: ndarray, number_of_sources: int, components_per_source: int,
                  number_of_directions: int, cartesian_coordinates: ndarray, direct_to_reverb_ratio: float,
@@ -42,22 +43,22 @@ class IS_IWLP(IS, PriorBase):
         super().__init__(
             covariance_matrices, number_of_sources, components_per_source, number_of_directions, random_generator)
         # 0th order magnitude normalization to ensure constant prior strength
-        self._R /= norm(sqrt(self._R[..., 0, 0].real))[..., None, None] ** 2
+        scale = norm(sqrt(self._R[..., 0])) ** 2
+        self._R /= scale
+        self._R_imag /= scale
         self._doa = deepcopy(cartesian_coordinates)
         self._dtrr = direct_to_reverb_ratio
         self._nu = degrees_of_freedom
 
     def update_Z(self):
-        hatRinv = pinv(self._hatR.sum(0))
         XIinv = pinv(self._XI)
-        z_n = trace(einsum('jft, ftab, ftbc, ftce, deg -> jdag', self._V, hatRinv, self._R, hatRinv, self._S,
-                           optimize=self._Z_path[0]), axis1=-1, axis2=-2)
-        z_d = einsum('jft, ftab, dab -> jd', self._V, hatRinv, self._S, optimize=self._Z_path[1])
-        trXIinvS = einsum('jab, dab -> jd', XIinv, self._S, optimize=self._Z_path[2])
+        z_n, z_d = self._sum_frequency_blocks(self._Z_terms)
+        trXIinvS = einsum('jab, dab -> jd', XIinv, self._S, optimize=self._Z_path[1])
         trPsiXIinvSXIinv = trace(einsum('jab, jbc, dce, jeg -> jdag', self._Psi, XIinv, self._S, XIinv,
-                                        optimize=self._Z_path[3]), axis1=-1, axis2=-2)
-        self._Z *= ((z_n / (self._F * self._T) + self._nu * trPsiXIinvSXIinv) /
-                    (z_d / (self._F * self._T) + self._L * trPsiXIinvSXIinv + (self._nu + self._L) * trXIinvS)).real
+                                        optimize=self._Z_path[2]), axis1=-1, axis2=-2)
+        self._Z *= self._update_ratio(
+            z_n / (self._F * self._T) + self._nu * trPsiXIinvSXIinv,
+            z_d / (self._F * self._T) + self._L * trPsiXIinvSXIinv + (self._nu + self._L) * trXIinvS)
         NTFBase.update_Z(self)
 
     @property
@@ -72,7 +73,7 @@ class IS_IWLP(IS, PriorBase):
     @cached_property
     def _Z_path(self):
         Z_path = super()._Z_path
-        Z_path.append(einsum_path('jab, dab -> jd', empty((self._J, self._L, self._L)), self._S, optimize='optimal')[0])
-        Z_path.append(einsum_path('jab, jbc, dce, jeg -> jdag', self._Psi, empty((self._J, self._L, self._L)), self._S,
-                                  empty((self._J, self._L, self._L)), optimize='optimal')[0])
+        Z_path.append(self._einsum_path('jab, dab -> jd', empty((self._J, self._L, self._L)), self._S))
+        Z_path.append(self._einsum_path('jab, jbc, dce, jeg -> jdag', self._Psi, empty((self._J, self._L, self._L)),
+                                        self._S, empty((self._J, self._L, self._L))))
         return Z_path
@@ -0,0 +1,147 @@
+from functools import cached_property
+from typing import Optional, Tuple
+
+from numpy import asarray, einsum, eye, log, ndarray, sqrt
+from numpy.linalg import eigh, inv, slogdet, solve
+from numpy.random import Generator
+
+from asintf.NTFBase import NTFBase
+from asintf.profiling import observed
+from asintf.stft import packed_indices, packed_trace_weights, unpack_covariance_matrices
+
+
+class IS_JD(NTFBase):
+    """
+    Non-negative Tensor Factorization with jointly diagonalisable Ambisonic Spatial Covariance Matrix Model, based on
+    Itakura-Saito divergence [1], [2].
+
+    The spatial covariance matrices are restricted to XI_j = U^-T diag(g_j) U^-1, where U is a diagonaliser shared by
+    all sources and g_j is the diagonal of U^T (sum_d Z_jd S_d) U. The model is fitted to the diagonals of the
+    transformed empirical covariance matrices U^T R U, hence no per time-frequency bin matrix inversion is required.
+    U is initialized with the eigenvectors of the average empirical covariance matrix and updated with iterative
+    projection (update_U), which can be frozen to keep all updates linear in the number of channels.
+
+    References
+    ----------
+    [1] N. Ito and T. Nakatani, "FastMNMF: Joint Diagonalization Based Accelerated Algorithms for Multichannel
+    Nonnegative Matrix Factorization", ICASSP 2019 - 2019 IEEE International Conference on Acoustics, Speech and Signal
+    Processing (ICASSP), Brighton, UK, 2019.
+    [2] K. Sekiguchi, Y. Bando, A. A. Nugraha, K. Yoshii and T. Kawahara, "Fast Multichannel Nonnegative Matrix
+    Factorization With Directivity-Aware Jointly-Diagonalizable Spatial Covariance Matrices for Blind Source
+    Separation", in IEEE/ACM Transactions on Audio, Speech, and Language Processing, vol. 28, 2020.
+
+    Notes
+    -----
+    The documentation only covers changes introduced in this class - for further description see the base class.
+    """
+    _state_names = NTFBase._state_names + ('_U',)
+    _shared_names = NTFBase._shared_names + ('_Y',)
+    _derived_names = NTFBase._derived_names + ('_G', '_hatY')
+    _tensors = dict({name: dimensions for name, dimensions in NTFBase._tensors.items() if name != '_hatR'},
+                    _hatY='FTL', _Y='FTL', _G='JL', _U='LL', _Uinv='LL', _diagS='DL')
+
+    def __init__(self, covariance_matrices: ndarray, number_of_sources: int, components_per_source: int,
+                 number_of_directions: int, random_generator: Optional[Generator] = None) -> None:
+        super().__init__(
+            covariance_matrices, number_of_sources, components_per_source, number_of_directions, random_generator)
+        self._update_order = 'QWHZU'
+
+    def update_Q(self):
+        q_n, q_d = self._sum_frequency_blocks(self._Q_terms)
+        self._Q *= self._update_ratio(q_n, q_d)
+        super().update_Q()
+
+    def update_W(self):
+        w_n, w_d = self._concatenate_frequency_blocks(self._W_terms, axis=0)
+        self._W *= self._update_ratio(w_n, w_d)
+        super().update_W()
+
+    def update_H(self):
+        h_n, h_d = self._sum_frequency_blocks(self._H_terms)
+        self._H *= self._update_ratio(h_n, h_d)
+        super().update_H()
+
+    def update_Z(self):
+        z_n, z_d = self._sum_frequency_blocks(self._Z_terms)
+        self._Z *= self._update_ratio(z_n, z_d)
+        super().update_Z()
+
+    def update_U(self) -> None:
+        weighted_R, = self._sum_frequency_blocks(
+            lambda f: (einsum('ftp, ftl -> lp', self._R[f], 1 / self._hatY[f]),))
+        weighted_R = unpack_covariance_matrices(weighted_R / (self._F * self._T))
+        for channel in range(self._L):
+            u = solve(self._U.T @ weighted_R[channel], eye(self._L)[channel])
+            self._U[:, channel] = u / sqrt(u @ weighted_R[channel] @ u)
+        self._reset_diagonaliser_dependent_properties()
+        self._calculate_XI()
+        self._calculate_hatR()
+
+    def set_order_limits(self, order_limits: ndarray) -> None:
+        if ((asarray(order_limits) + 1) ** 2 < self._L).any():
+            raise ValueError('The shared diagonaliser mixes all channels, hence orders can not be truncated.')
+        super().set_order_limits(order_limits)
+
+    @observed
+    def _calculate_XI(self) -> None:
+        super()._calculate_XI()
+        self._G = einsum('al, jab, bl -> jl', self._U, self._XI, self._U)
+
+    @observed
+    def _calculate_hatR(self) -> None:
+        self._hatY, = self._concatenate_frequency_blocks(
+            lambda f: (einsum('jft, jl -> ftl', self._V[:, f], self._G),), axis=0)
+
+    def _reset_diagonaliser_dependent_properties(self) -> None:
+        self._reset_cached_properties('_Uinv', '_Y', '_diagS')
+
+    def _reset_direction_dependent_properties(self) -> None:
+        super()._reset_direction_dependent_properties()
+        self._reset_cached_properties('_diagS')
+
+    def _reset_grid_dependent_properties(self) -> None:
+        super()._reset_grid_dependent_properties()
+        self._reset_cached_properties('_Y')
+
+    def _XI_traces(self, f: slice) -> Tuple[ndarray, ndarray]:
+        hatYinv = 1 / self._hatY[f]
+        return einsum('ftl, jl -> jft', self._Y[f] * hatYinv ** 2, self._G), einsum('ftl, jl -> jft', hatYinv, self._G)
+
+    def _Z_terms(self, f: slice) -> Tuple[ndarray, ndarray]:
+        hatYinv = 1 / self._hatY[f]
+        z_n = einsum('jft, ftl, dl -> jd', self._V[:, f], self._Y[f] * hatYinv ** 2, self._diagS, optimize=True)
+        z_d = einsum('jft, ftl, dl -> jd', self._V[:, f], hatYinv, self._diagS, optimize=True)
+        return z_n, z_d
+
+    def _cost_terms(self, f: slice) -> Tuple[float]:
+        return (self._Y[f] / self._hatY[f] + log(self._hatY[f])).sum(),
+
+    @property
+    def covariance_matrices(self) -> ndarray:
+        return einsum('jft, jab -> jftab', self._V, self.spatial_covariance_matrices)
+
+    @property
+    def cost_function(self) -> float:
+        return self._sum_frequency_blocks(self._cost_terms)[0] / (self._F * self._T) - 2 * slogdet(self._U)[1]
+
+    @property
+    def spatial_covariance_matrices(self) -> ndarray:
+        return einsum('la, jl, lb -> jab', self._Uinv, self._G, self._Uinv)
+
+    @cached_property
+    def _diagS(self) -> ndarray:
+        return einsum('al, dab, bl -> dl', self._U, self._S, self._U)
+
+    @cached_property
+    def _U(self) -> ndarray:
+        return eigh(unpack_covariance_matrices(self._R.mean(axis=(0, 1))))[1]
+
+    @cached_property
+    def _Uinv(self) -> ndarray:
+        return inv(self._U)
+
+    @cached_property
+    def _Y(self) -> ndarray:
+        rows, columns = packed_indices(self._L)
+        packed_U = packed_trace_weights(self._L)[:, None] * self._U[rows] * self._U[columns]
+        return self._concatenate_frequency_blocks(lambda f: (self._R[f] @ packed_U,), axis=0)[0]
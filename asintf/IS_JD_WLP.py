@@ -0,0 +1,84 @@
+from copy import deepcopy
+from functools import cached_property
+from typing import Optional
+
+from numpy import einsum, log, ndarray, sqrt
+from numpy.linalg import norm, pinv, slogdet
+from numpy.random import Generator
+
+from asintf.IS_JD import IS_JD
+from asintf.NTFBase import NTFBase
+from asintf.PriorBase import PriorBase
+
+
+class IS_JD_WLP(IS_JD, PriorBase):
+    """
+    Non-negative Tensor Factorization with jointly diagonalisable Ambisonic Spatial Covariance Matrix Model and
+    Wishart Localization Prior, based on Itakura-Saito divergence [1].
+
+    The prior is evaluated on the jointly diagonalisable spatial covariance matrices. The diagonaliser U is frozen, as
+    the iterative projection update accounts for the likelihood term only.
+
+    References
+    ----------
+    [1] M. Guzik and K. Kowalczyk, "On Ambisonic Source Separation with Spatially Informed Non-negative Tensor
+    Factorization," in IEEE/ACM Transactions on Audio, Speech, and Language Processing, doi: 10.1109/TASLP.2024.3399618.
+
+    Notes
+    -----
+    The documentation only covers changes introduced in this class - for further description see the base class.
+    """
+    _state_names = IS_JD._state_names + ('_doa', '_dtrr', '_nu')
+
+    def __init__(self, covariance_matrices: ndarray, number_of_sources: int, components_per_source: int,
+                 number_of_directions: int, cartesian_coordinates: ndarray, direct_to_reverb_ratio: float,
+                 degrees_of_freedom: float, random_generator: Optional[Generator] = None):
+        """
+        Parameters
+        ----------
+        cartesian_coordinates: ndarray
+            Directions of arrival in Cartesian coordinate system. Shape: source x 3 coordinates (x, y, z)
+        direct_to_reverb_ratio: float
+            Direct-to-reverb magnitude ratio.
+        degrees_of_freedom: float
+            Degrees of freedom of the Wishart distribution.
+        """
+        super().__init__(
+            covariance_matrices, number_of_sources, components_per_source, number_of_directions, random_generator)
+        # 0th order magnitude normalization to ensure constant prior strength
+        scale = norm(sqrt(self._R[..., 0])) ** 2
+        self._R /= scale
+        self._R_imag /= scale
+        self._doa = deepcopy(cartesian_coordinates)
+        self._dtrr = direct_to_reverb_ratio
+        self._nu = degrees_of_freedom
+        self.freeze('U')
+
+    def update_Z(self) -> None:
+        z_n, z_d = self._sum_frequency_blocks(self._Z_terms)
+        trXIinvS = einsum('dl, jl -> jd', self._diagS, 1 / self._G)
+        trPsiinvS = einsum('dl, jl -> jd', self._diagS, self._diagPsiinv)
+        self._Z *= self._update_ratio(z_n / (self._F * self._T) + self._nu * trXIinvS,
+                                      z_d / (self._F * self._T) + self._L * trXIinvS + self._nu * trPsiinvS)
+        NTFBase.update_Z(self)
+
+    def _reset_diagonaliser_dependent_properties(self) -> None:
+        super()._reset_diagonaliser_dependent_properties()
+        self._reset_cached_properties('_diagPsiinv')
+
+    @property
+    def cost_function(self) -> float:
+        return (super().cost_function + self._nu * (self._diagPsiinv * self._G).sum() -
+                (self._nu - self._L) * (log(self._G).sum() - 2 * self._J * slogdet(self._U)[1]))
+
+    @cached_property
+    def _diagPsiinv(self) -> ndarray:
+        return einsum('la, jab, lb -> jl', self._Uinv, self._Psiinv, self._Uinv)
+
+    @cached_property
+    def _Psi(self) -> ndarray:
+        return self._calculate_prior_matrix(self._doa, self._L, self._dtrr)
+
+    @cached_property
+    def _Psiinv(self) -> ndarray:
+        return pinv(self._Psi)
@@ -2,7 +2,7 @@ from copy import deepcopy
 from functools import cached_property
 from typing import List, Tuple, Union, Optional
 
-from numpy import einsum, einsum_path, empty, log, ndarray, sqrt, trace
+from numpy import einsum, empty, log, ndarray, sqrt, trace
 from numpy.linalg import det, norm, pinv
 from numpy.random import Generator
 
@@ -25,6 +25,7 @@ class IS_WLP(IS, PriorBase):
     -----
     The documentation only covers changes introduced in this class - for further description see the base class.
     """
+    _state_names = IS._state_names + ('_doa', '_dtrr', '_nu')
 
     def __init__(self, covariance_matrices: ndarray, number_of_sources: int, components_per_source: int,
                  number_of_directions: int, cartesian_coordinates: ndarray, direct_to_reverb_ratio: float,
@@ -42,21 +43,24 @@ class IS_WLP(IS, PriorBase):
         super().__init__(
             covariance_matrices, number_of_sources, components_per_source, number_of_directions, random_generator)
         # 0th order magnitude normalization to ensure constant prior strength
-        self._R /= norm(sqrt(self._R[..., 0, 0].real))[..., None, None] ** 2
+        scale = norm(sqrt(self._R[..., 0])) ** 2
+        self._R /= scale
+        self._R_imag /= scale
         self._doa = deepcopy(cartesian_coordinates)
         self._dtrr = direct_to_reverb_ratio
         self._nu = degrees_of_freedom
 
     def update_Z(self) -> None:
-        hatRinv = pinv(self._hatR.sum(0))
-        z_n = trace(einsum('jft, ftab, ftbc, ftce, deg -> jdag', self._V, hatRinv, self._R, hatRinv, self._S,
-                           optimize=self._Z_path[0]), axis1=-1, axis2=-2)
-        z_d = einsum('jft, ftab, dab -> jd', self._V, hatRinv, self._S, optimize=self._Z_path[1])
-        trXIinvS = einsum('jab, dab -> jd', pinv(self._XI), self._S, optimize=self._Z_path[2])
-        self._Z *= ((z_n / (self._F * self._T) + self._nu * trXIinvS) /
-                    (z_d / (self._F * self._T) + self._L * trXIinvS + self._nu * self._trPsiinvS)).real
+        z_n, z_d = self._sum_frequency_blocks(self._Z_terms)
+        trXIinvS = einsum('jab, dab -> jd', pinv(self._XI), self._S, optimize=self._Z_path[1])
+        self._Z *= self._update_ratio(z_n / (self._F * self._T) + self._nu * trXIinvS,
+                                      z_d / (self._F * self._T) + self._L * trXIinvS + self._nu * self._trPsiinvS)
         NTFBase.update_Z(self)
 
+    def _reset_direction_dependent_properties(self) -> None:
+        super()._reset_direction_dependent_properties()
+        self._reset_cached_properties('_trPsiinvS')
+
     @property
     def cost_function(self) -> float:
         return (super().cost_function + self._nu * trace(self._Psiinv @ self._XI, axis1=-2, axis2=-1).sum() -
@@ -77,5 +81,5 @@ class IS_WLP(IS, PriorBase):
     @cached_property
     def _Z_path(self) -> List[List[Union[str, Tuple[int]]]]:
         Z_path = super()._Z_path
-        Z_path.append(einsum_path('jab, dab -> jd', empty((self._J, self._L, self._L)), self._S, optimize='optimal')[0])
+        Z_path.append(self._einsum_path('jab, dab -> jd', empty((self._J, self._L, self._L)), self._S))
         return Z_path
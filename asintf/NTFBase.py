@@ -1,28 +1,59 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from copy import deepcopy
 from functools import cached_property
-from typing import List, Optional, Union, Tuple
+from json import dumps, loads
+from os import replace
+from re import sub
+from typing import Callable, Dict, Iterator, List, Optional, Union, Tuple
 
-from numpy import einsum, einsum_path, ndarray
+from numpy import (arange, argsort, asarray, broadcast_to, concatenate, diff, einsum, einsum_path, finfo, flatnonzero,
+                   full, inf, isfinite, isin, linspace, load, maximum, minimum, ndarray, ones, pi, repeat, result_type,
+                   savez_compressed, searchsorted, sort, sqrt, stack, unique, zeros)
+from numpy.linalg import LinAlgError, norm
 from numpy.random import default_rng, Generator
+from threadpoolctl import ThreadpoolController
 
-from asintf.geometry import cartesian_to_spherical, fibonacci_sphere
+from asintf.geometry import cartesian_to_spherical, fibonacci_cap, fibonacci_sphere
+from asintf.profiling import observed, stage
+from asintf.reconstruction import pwd
 from asintf.spherical_harmonics import matrix, number_of_channels_to_order
+from asintf.stft import (number_of_channels_to_packed_size, pack_covariance_matrices, packed_indices,
+                         packed_size_to_number_of_channels, pool, pool_covariance_matrices, unpack_covariance_matrices)
+
+_threadpool_controller = ThreadpoolController()
 
 
 class NTFBase(ABC):
     """
     Attributes
     ----------
+    component_indices
+        Indices of the remaining components among the initial ones. For details see: prune_components.
+        Shape: [component]
     covariance_matrices
         Estimated covariance matrices. Shape: [source x frequency x frame x channel x channel]
     cost_function
         Current value of the cost function.
+    directions
+        Cartesian coordinates of the direction grid. Shape: [direction x 3 (x, y, z)]
+    factors
+        Copies of the factors Q, W, H and Z. Shapes: [source x component], [frequency x component],
+        [frame x component] and [source x direction]
+    number_of_iterations
+        Number of completed iterations.
     spatial_covariance_matrices
         Estimated spatial covariance matrices. Shape: [source x channel x channel]
     spectrograms
         Estimated spectrograms. Shape: [source x frequency x frame]
     """
+    _state_names = ('_Q', '_W', '_H', '_Z', '_D', '_directions', '_patch_radius', '_patch_directions',
+                    '_component_indices', '_iteration')
+    _shared_names = ('_R', '_R_imag', '_S', '_directions')
+    _derived_names = ('_V', '_XI', '_hatR')
+    _tensors = {'_R': 'FTP', '_R_imag': 'FTO', '_hatR': 'JFTP', '_V': 'JFT', '_Q': 'JK', '_W': 'FK', '_H': 'TK',
+                '_Z': 'JD', '_S': 'DLL', '_XI': 'JLL'}
 
     def __init__(self, covariance_matrices: ndarray, number_of_sources: int, components_per_source: int,
                  number_of_directions: int, random_generator: Optional[Generator] = None) -> None:
@@ -30,7 +61,10 @@ class NTFBase(ABC):
         Parameters
         ----------
         covariance_matrices
-            Empirical covariance matrices. Shape: [frequency x frame x channel x channel]
+            Empirical covariance matrices, either dense or packed, see stft.pack_covariance_matrices. The model keeps
+            the real parts of the packed upper triangles and the imaginary parts of their off-diagonal entries only,
+            i.e., channel^2 real numbers per matrix, half the memory of the dense matrices.
+            Shape: [frequency x frame x channel x channel] or [frequency x frame x packed entry]
         number_of_sources
             Number of sources.
         components_per_source
@@ -40,19 +74,47 @@ class NTFBase(ABC):
         random_generator
             Random number generator. For details see: https://numpy.org/doc/stable/reference/random/generator.html
         """
-        self._R = deepcopy(covariance_matrices)
+        self._set_covariance_matrices(covariance_matrices)
         self._J = number_of_sources
         self._Kpj = components_per_source
         self._D = number_of_directions
         if random_generator is None:
             random_generator = default_rng()
         self._rnd_gn = random_generator
-        self._F, self._T, self._L, _ = self._R.shape
+        self._n_threads = 1
+        self._executor = None
+        self._blas_limited = False
+        self._mapping_blocks = False
+        self._iteration = 0
+        self._update_order = 'QWHZ'
+        self._update_periods = {}
+        self._update_limits = {}
+        self._frozen = set()
+        self._exponent = 1.
+        self._inner_repetitions = 1
+        self._extrapolation = False
+        self._component_blocks = None
+        self._direction_refinement = None
+        self._component_pruning = None
+        self._minibatch = None
+        self._health_check = None
+        self._denominator_floor = 0.
+        self._contractions = {}
+        self._L = packed_size_to_number_of_channels(self._R.shape[2])
         self._initialize_QWHZ()
         self._calculate_V()
         self._calculate_XI()
         self._calculate_hatR()
 
+    def _set_covariance_matrices(self, covariance_matrices: ndarray) -> None:
+        # only the real parts enter the traces against the real symmetric XI and S, hence they are kept apart from the
+        # imaginary parts of the off-diagonal entries, which only add to the norms of R
+        packed = pack_covariance_matrices(covariance_matrices) if covariance_matrices.ndim == 4 else covariance_matrices
+        rows, columns = packed_indices(packed_size_to_number_of_channels(packed.shape[-1]))
+        self._R = packed.real.copy()
+        self._R_imag = packed.imag[..., rows != columns]
+        self._F, self._T = self._R.shape[:2]
+
     def _initialize_QWHZ(self) -> None:
         self._Q = self._rnd_gn.random((self._J, self._K))
         self._W = self._rnd_gn.random((self._F, self._K))
@@ -60,53 +122,788 @@ class NTFBase(ABC):
         self._Z = self._rnd_gn.random((self._J, self._D))
         self._normalize_QWHZ()
 
+    @observed
+    def initialize_from_beamformer(self, stft: ndarray, directions_of_arrival_cartesian: ndarray,
+                                   number_of_iterations: int = 10, floor: float = 1e-2) -> None:
+        """
+        Replaces the random initialization with a warm start from the Plane Wave Decomposition beamformer. Z is
+        concentrated on the grid direction nearest to each direction of arrival, the remaining components of each
+        source, see prune_components, are fitted to its beamformer power spectrogram with Euclidean NMF, and Q assigns
+        them to their source. Frozen factors are left unchanged.
+
+        Parameters
+        ----------
+        stft
+            Multichannel Short Time Fourier Transform coefficients. Shape: [channel x frequency x frame]
+        directions_of_arrival_cartesian
+            Cartesian coordinates of the directions of arrival. Shape: [source x 3 (x, y, z)]
+        number_of_iterations
+            Number of NMF iterations per source.
+        floor
+            Weight of the remaining directions in Z and the remaining sources in Q, relative to the assigned ones,
+            which keeps them reachable by the multiplicative updates.
+        """
+        spherical_harmonic_matrix = matrix(
+            cartesian_to_spherical(directions_of_arrival_cartesian)[:, 1:], number_of_channels_to_order(self._L))
+        spherical_harmonic_matrix /= norm(spherical_harmonic_matrix, axis=1)[:, None]
+        P = abs(pwd(stft, spherical_harmonic_matrix[:, None, None])) ** 2
+        W, H = self._W.copy(), self._H.copy()
+        Q = full((self._J, len(self._component_indices)), floor)
+        for j, block in enumerate(self._partition_blocks()):
+            for _ in range(number_of_iterations):
+                W[:, block] *= (P[j] @ H[:, block]) / (W[:, block] @ (H[:, block].T @ H[:, block]))
+                H[:, block] *= (P[j].T @ W[:, block]) / (H[:, block] @ (W[:, block].T @ W[:, block]))
+            Q[j, block] = 1
+        Z = full((self._J, self._D), floor)
+        nearest = (self._directions @ (directions_of_arrival_cartesian /
+                                       norm(directions_of_arrival_cartesian, axis=1)[:, None]).T).argmax(axis=0)
+        Z[arange(self._J), nearest] = 1
+        H *= self._R[..., 0].sum() / P.sum()
+        self._set_factors({factor: value for factor, value in zip('QWHZ', (Q, W, H, Z)) if factor not in self._frozen})
+
+    def initialize_from_model(self, model: 'NTFBase') -> None:
+        """
+        Replaces the factors with those of another model fitted to the same covariance matrices, e.g. the EU
+        counterpart of an IS model. Z is taken over together with its direction grid, and H is rescaled by the ratio
+        of the 0th order energies, which compensates the normalization of the covariance matrices by the prior models.
+        The components pruned from the other model are dropped as well. Frozen factors are left unchanged, apart from
+        the dropped components.
+
+        Parameters
+        ----------
+        model
+            Model with the same number of sources and components per source.
+        """
+        factors = model.factors
+        factors['H'] *= self._R[..., 0].sum() / model._R[..., 0].sum()
+        if 'Z' not in self._frozen:
+            self._D, self._directions, self._patch_radius = model._D, model.directions, model._patch_radius
+            self._patch_directions = model._patch_directions.copy()
+            self._reset_direction_dependent_properties()
+        self._select_components(model.component_indices, ''.join(self._frozen & set('QWH')))
+        self._set_factors({factor: value for factor, value in factors.items() if factor not in self._frozen})
+        if self._component_blocks is not None:
+            self.partition_components()
+
     def set_Q(self, Q: ndarray) -> None:
         self._Q = deepcopy(Q)
+        self._reset_cached_properties('_accepted_cost')
         self._normalize_QWHZ()
         self._calculate_V()
         self._calculate_hatR()
 
     def set_W(self, W: ndarray) -> None:
         self._W = deepcopy(W)
+        self._reset_cached_properties('_accepted_cost')
         self._normalize_QWHZ()
         self._calculate_V()
         self._calculate_hatR()
 
     def set_H(self, H: ndarray) -> None:
         self._H = deepcopy(H)
+        self._reset_cached_properties('_accepted_cost')
         self._normalize_QWHZ()
         self._calculate_V()
         self._calculate_hatR()
 
     def set_Z(self, Z: ndarray) -> None:
         self._Z = deepcopy(Z)
+        self._reset_cached_properties('_accepted_cost')
         self._normalize_QWHZ()
         self._calculate_V()
         self._calculate_XI()
         self._calculate_hatR()
 
+    def set_components_per_source(self, components_per_source: int) -> None:
+        """
+        Parameters
+        ----------
+        components_per_source
+            Number of components per source. Q, W and H are reinitialized randomly, Z is kept.
+        """
+        self._Kpj = components_per_source
+        self._reset_cached_properties('_K', '_component_indices', '_H_path', '_Q_path', '_V_path', '_W_path')
+        self._set_factors({'Q': self._rnd_gn.random((self._J, self._K)), 'W': self._rnd_gn.random((self._F, self._K)),
+                           'H': self._rnd_gn.random((self._T, self._K))})
+        if self._component_blocks is not None:
+            self.partition_components()
+
+    def partition_components(self) -> None:
+        """
+        Assigns a separate block of components_per_source components to each source. Q is fixed to the
+        block-diagonal assignment matrix and frozen, so that the spectral contractions skip the cross-source terms.
+        """
+        self._component_blocks = self._partition_blocks()
+        Q = zeros((self._J, len(self._component_indices)))
+        for j, block in enumerate(self._component_blocks):
+            Q[j, block] = 1
+        self.freeze('Q')
+        self.set_Q(Q)
+
+    def _partition_blocks(self) -> List[slice]:
+        boundaries = searchsorted(self._component_indices // self._Kpj, arange(self._J + 1))
+        return [slice(start, stop) for start, stop in zip(boundaries[:-1], boundaries[1:])]
+
+    def set_component_pruning(self, period: int, threshold: float = 1e-3) -> None:
+        """
+        Parameters
+        ----------
+        period
+            Number of iterations between the prunings of the components. For details see: prune_components.
+        threshold
+            Share of the total energy of the spectrograms below which a component is dropped.
+        """
+        self._component_pruning = (period, threshold)
+
+    @observed
+    def prune_components(self, threshold: float = 1e-3) -> None:
+        """
+        Drops the components whose share of the total energy of the spectrograms is below the threshold, i.e., their
+        columns of Q, W and H, which shrinks all spectral contractions. The component contributing the most energy to
+        every source is kept, hence no source loses all of its spectrogram. The remaining components are listed by
+        component_indices.
+
+        Parameters
+        ----------
+        threshold
+            Share of the total energy of the spectrograms below which a component is dropped.
+        """
+        source_energies = self._Q * (self._W.sum(axis=0) * self._H.sum(axis=0))
+        energies = source_energies.sum(axis=0)
+        kept = energies >= threshold * energies.sum()
+        kept[source_energies.argmax(axis=1)] = True
+        if kept.all():
+            return
+        self._component_indices = self._component_indices[kept]
+        self._reset_cached_properties('_H_path', '_Q_path', '_V_path', '_W_path')
+        if self._component_blocks is not None:
+            self._component_blocks = self._partition_blocks()
+        self._set_factors({'Q': self._Q[:, kept], 'W': self._W[:, kept], 'H': self._H[:, kept]})
+
+    def _select_components(self, component_indices: ndarray, factors: str) -> None:
+        # the given factors are kept, hence they are reduced to the selected components
+        kept = isin(self._component_indices, component_indices)
+        if kept.sum() < len(component_indices):
+            raise ValueError('Some of the components were pruned from this model.')
+        self._component_indices = component_indices
+        self._reset_cached_properties('_H_path', '_Q_path', '_V_path', '_W_path')
+        if self._component_blocks is not None:
+            self._component_blocks = self._partition_blocks()
+        for factor in factors:
+            setattr(self, '_' + factor, getattr(self, '_' + factor)[:, kept])
+
+    def set_direction_refinement(self, period: int, threshold: float = 0.1, patch_size: int = 4) -> None:
+        """
+        Parameters
+        ----------
+        period
+            Number of iterations between the refinements of the direction grid. For details see: refine_directions.
+            The refinements are skipped while Z is frozen, see freeze.
+        threshold
+            Weight in Z, relative to the largest weight of the source, below which a direction is inactive.
+        patch_size
+            Number of directions added around the direction of the largest weight of every source.
+        """
+        self._direction_refinement = (period, threshold, patch_size)
+
+    @observed
+    def refine_directions(self, threshold: float = 0.1, patch_size: int = 4) -> None:
+        """
+        Drops the directions whose weight in Z is below the threshold for every source and surrounds the direction of
+        the largest weight of every source with a patch of new directions on a spherical cap. The patches replace
+        those of the previous refinement, of which only the directions of the largest weights are kept. The grid never
+        grows, hence the weakest active directions are dropped, and the patches are shrunk if needed, to make room for
+        the patches. The cap radius starts at half the spacing of the initial grid and is halved with every
+        refinement. The weight of a refined direction is split evenly within its patch.
+
+        Parameters
+        ----------
+        threshold
+            Weight in Z, relative to the largest weight of the source, below which a direction is inactive.
+        patch_size
+            Number of directions added around the direction of the largest weight of every source.
+        """
+        peaks = zeros(self._D, dtype=bool)
+        peaks[self._Z.argmax(axis=1)] = True
+        weights = (self._Z / self._Z.max(axis=1, keepdims=True)).max(axis=0)
+        active = (weights >= threshold) & ~peaks & ~self._patch_directions
+        patch_size = min(patch_size, self._D // peaks.sum() - 1)
+        surplus = active.sum() - (self._D - peaks.sum() * (patch_size + 1))
+        if surplus > 0:
+            active[flatnonzero(active)[argsort(weights[active])[:surplus]]] = False
+        patches = fibonacci_cap(self._directions[peaks], self._patch_radius, patch_size)
+        self._directions = concatenate(
+            (self._directions[active], concatenate((self._directions[peaks, None], patches), axis=1).reshape(-1, 3)))
+        self._patch_directions = concatenate((zeros(active.sum(), dtype=bool),
+                                              ones(peaks.sum() * (patch_size + 1), dtype=bool)))
+        self._patch_radius /= 2
+        self._D = len(self._directions)
+        self._reset_direction_dependent_properties()
+        self.set_Z(concatenate((self._Z[:, active],
+                                repeat(self._Z[:, peaks] / (patch_size + 1), patch_size + 1, axis=1)), axis=1))
+
+    def set_order_limits(self, order_limits: ndarray) -> None:
+        """
+        Parameters
+        ----------
+        order_limits
+            Maximum Spherical Harmonic order per frequency bin. The model of each bin only uses the channels up to the
+            given order. For details see: spherical_harmonics.frequency_to_order. Shape: [frequency]
+        """
+        self._channel_limits = minimum((asarray(order_limits) + 1) ** 2, self._L)
+        self._reset_grid_dependent_properties()
+
+    def set_number_of_threads(self, number_of_threads: int) -> None:
+        """
+        Parameters
+        ----------
+        number_of_threads
+            Number of threads. The updates are split into contiguous frequency blocks, one per thread, which are
+            processed by a thread pool kept by the model, and BLAS is limited to a single thread during the
+            iterations.
+        """
+        self._shutdown_executor()
+        self._n_threads = number_of_threads
+        self._reset_cached_properties('_frequency_blocks')
+
+    def _shutdown_executor(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _channels(self, f: slice) -> slice:
+        return slice(0, self._channel_limits[f.start])
+
+    def _packed_channels(self, f: slice) -> slice:
+        return slice(0, number_of_channels_to_packed_size(self._channel_limits[f.start]))
+
+    def _map_frequency_blocks(self, function: Callable[[slice], Tuple[ndarray, ...]]) -> List[Tuple[ndarray, ...]]:
+        function = observed(function)
+        # nested calls, e.g. cached properties computed within a block, run inline, since the blocks occupy the pool
+        if self._n_threads == 1 or self._mapping_blocks or len(self._frequency_blocks) == 1:
+            return list(map(function, self._frequency_blocks))
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self._n_threads)
+        self._mapping_blocks = True
+        try:
+            with self._single_threaded_blas():
+                return list(self._executor.map(function, self._frequency_blocks))
+        finally:
+            self._mapping_blocks = False
+
+    @contextmanager
+    def _single_threaded_blas(self) -> Iterator[None]:
+        # the limit is set once per iteration, the nested calls within it are no-ops
+        if self._n_threads == 1 or self._blas_limited:
+            yield
+            return
+        self._blas_limited = True
+        try:
+            with _threadpool_controller.limit(limits=1, user_api='blas'):
+                yield
+        finally:
+            self._blas_limited = False
+
+    def _sum_frequency_blocks(self, function: Callable[[slice], Tuple[ndarray, ...]]) -> Tuple[ndarray, ...]:
+        return tuple(sum(partial_sums) for partial_sums in zip(*self._map_frequency_blocks(function)))
+
+    def _concatenate_frequency_blocks(self, function: Callable[[slice], Tuple[ndarray, ...]],
+                                      axis: int) -> Tuple[ndarray, ...]:
+        return tuple(parts[0] if len(parts) == 1 else concatenate(parts, axis=axis)
+                     for parts in zip(*self._map_frequency_blocks(function)))
+
+    @observed
     def _normalize_QWHZ(self) -> None:
-        self._Q *= self._Z.sum(axis=-1)[..., None]
-        self._Z /= self._Z.sum(axis=-1)[..., None]
-        self._W *= self._Q.sum(axis=0)[None]
-        self._Q /= self._Q.sum(axis=0)[None]
-        self._H *= self._W.sum(axis=0)[None]
-        self._W /= self._W.sum(axis=0)[None]
+        # the scales are only moved between unfrozen factors, hence frozen factors stay bit-identical
+        free = [factor for factor in 'WH' if factor not in self._frozen]
+        if 'Z' not in self._frozen:
+            scales = self._Z.sum(axis=-1)
+            if 'Q' not in self._frozen:
+                self._Q *= scales[..., None]
+                self._Z /= scales[..., None]
+            elif free and ((self._Q != 0).sum(axis=0) == 1).all():
+                # with a single source per component, the scale of the source equals a scale of its components
+                setattr(self, '_' + free[0], getattr(self, '_' + free[0]) * (scales @ self._Q / self._Q.sum(axis=0)))
+                self._Z /= scales[..., None]
+        if 'Q' not in self._frozen and free:
+            setattr(self, '_' + free[0], getattr(self, '_' + free[0]) * self._Q.sum(axis=0)[None])
+            self._Q /= self._Q.sum(axis=0)[None]
+        if free == ['W', 'H']:
+            self._H *= self._W.sum(axis=0)[None]
+            self._W /= self._W.sum(axis=0)[None]
 
+    @observed
     def _calculate_V(self) -> None:
-        self._V = einsum('jk, fk, tk -> jft', self._Q, self._W, self._H, optimize=self._V_path)
+        self._V, = self._concatenate_frequency_blocks(lambda f: (self._V_block(f),), axis=1)
 
+    def _V_block(self, f: slice) -> ndarray:
+        if self._component_blocks is None:
+            return einsum('jk, fk, tk -> jft', self._Q, self._W[f], self._H, optimize=self._V_path)
+        return stack([self._W[f, block] @ self._H[:, block].T for block in self._component_blocks])
+
+    @observed
     def _calculate_XI(self) -> None:
         self._XI = einsum('jd, dab -> jab', self._Z, self._S, optimize=self._XI_path)
 
+    @observed
     def _calculate_hatR(self) -> None:
-        self._hatR = einsum('jft, jab -> jftab', self._V, self._XI, optimize=self._hatR_path)
+        packed_XI = pack_covariance_matrices(self._XI)
+        self._hatR, = self._concatenate_frequency_blocks(
+            lambda f: (einsum('jft, jp -> jftp', self._V[:, f], packed_XI, optimize=self._hatR_path),), axis=1)
+
+    def set_schedule(self, order: Optional[str] = None, periods: Optional[Dict[str, int]] = None,
+                     limits: Optional[Dict[str, int]] = None) -> None:
+        """
+        Parameters
+        ----------
+        order
+            Order in which the factors are updated within an iteration, e.g. 'ZQWH'. If None, the current order is
+            kept.
+        periods
+            Update periods of the factors, e.g. {'Z': 5} updates Z every 5th iteration. Unlisted factors are updated
+            in every iteration.
+        limits
+            Number of iterations after which the factors stop being updated, e.g. {'W': 20} updates W only during the
+            first 20 iterations. Unlisted factors are updated indefinitely.
+        """
+        if order is not None:
+            self._update_order = order
+        self._update_periods = dict(periods or {})
+        self._update_limits = dict(limits or {})
+
+    def freeze(self, factors: str) -> None:
+        """
+        Parameters
+        ----------
+        factors
+            Factors excluded from the updates, e.g. 'WZ'. The updates of frozen factors and the rebuilds following
+            them are skipped, and the normalization leaves them unchanged by moving the scales into unfrozen factors.
+        """
+        self._frozen.update(factors)
+
+    def unfreeze(self, factors: str) -> None:
+        """
+        Parameters
+        ----------
+        factors
+            Factors to be updated again, e.g. 'W'.
+        """
+        self._frozen.difference_update(factors)
+
+    def set_acceleration(self, exponent: float = 1., extrapolation: bool = False, inner_repetitions: int = 1) -> None:
+        """
+        Parameters
+        ----------
+        exponent
+            Exponent applied to the multiplicative update ratios. Values above 1 over-relax the updates.
+        extrapolation
+            If True, the factors are extrapolated along the change made by the last iteration [1]. The extrapolation
+            step grows while the cost function of the extrapolated factors is finite and does not exceed that of the
+            current factors; otherwise the extrapolated factors are discarded and the step is reduced.
+        inner_repetitions
+            Number of repetitions of each consecutive run of Q, W and H updates in the update order, i.e., per single
+            update of Z and rebuild of XI.
+
+        References
+        ----------
+        [1] A. M. S. Ang and N. Gillis, "Accelerating Nonnegative Matrix Factorization Algorithms Using
+        Extrapolation," Neural Computation, vol. 31, no. 2, pp. 417-439, 2019, doi: 10.1162/neco_a_01157.
+        """
+        self._exponent = exponent
+        self._inner_repetitions = inner_repetitions
+        self._extrapolation = extrapolation
+        self._beta, self._beta_max = 0.5, 1.
+        self._reset_cached_properties('_accepted_cost')
+
+    def set_health_check(self, period: Optional[int], floor: float = finfo(float).tiny,
+                         maximum_restarts: int = 0) -> None:
+        """
+        Parameters
+        ----------
+        period
+            Number of iterations between the checks whether all factors are finite. The state of every passed check is
+            kept, and a failed check, or a LinAlgError within an iteration, either restarts from it or raises a
+            FloatingPointError naming the non-finite factors. None disables the checks and the floor.
+        floor
+            Lower bound of the denominators of the multiplicative update ratios, which keeps zero denominators from
+            producing inf or nan.
+        maximum_restarts
+            Number of restarts from the last passed check before a FloatingPointError is raised. A restart switches
+            off the over-relaxation and the extrapolation, see set_acceleration. Without them and without mini-batches
+            a restart would diverge again, hence the error is raised right away.
+        """
+        self._health_check = None if period is None else (period, maximum_restarts)
+        self._denominator_floor = 0. if period is None else floor
+        self._restarts = 0
+        self._healthy_state = self._state()
+
+    def set_minibatch(self, number_of_frames: Optional[int], decay: float = 0.7,
+                      full_batch_period: Optional[int] = None) -> None:
+        """
+        Parameters
+        ----------
+        number_of_frames
+            Number of frames drawn in every iteration. The frames are drawn from a random permutation, so every frame
+            is visited once within frame // number_of_frames iterations. H is only updated for the drawn frames, while
+            the updated Q, W and Z are blended with their previous values using the step size
+            (iteration + 1) ** -decay. None disables the stochastic updates.
+        decay
+            Decay exponent of the step size within (0.5, 1]. A value of 1 averages the estimates of all iterations.
+        full_batch_period
+            Number of iterations between full batch iterations, which update all factors on all frames. If None, only
+            stochastic iterations are run.
+        """
+        self._minibatch = None if number_of_frames is None else (
+            min(number_of_frames, self._T), decay, full_batch_period)
+        self._frame_queue = zeros(0, dtype=int)
+
+    @observed
+    def fit_coarse(self, frequency_factor: int, frame_factor: int, number_of_iterations: int) -> None:
+        """
+        Fits the model to covariance matrices averaged over blocks of adjacent frequency bins and frames, and
+        upsamples W and H to the full grid afterwards. Q and Z do not depend on the resolution and carry over
+        unchanged, and frozen W or H are restored at full resolution. The coarse iterations follow the update schedule
+        without extrapolation, mini-batches and direction refinement, and count towards number_of_iterations.
+
+        Parameters
+        ----------
+        frequency_factor
+            Number of frequency bins per block.
+        frame_factor
+            Number of frames per block.
+        number_of_iterations
+            Number of iterations on the coarse grid.
+        """
+        R, R_imag, F, T, channel_limits = self._R, self._R_imag, self._F, self._T, self._channel_limits
+        W, H = self._W, self._H
+        self._R = pool_covariance_matrices(R, frequency_factor, frame_factor)
+        self._R_imag = pool_covariance_matrices(R_imag, frequency_factor, frame_factor)
+        self._W, self._H = pool(self._W, frequency_factor, 0), pool(self._H, frame_factor, 0)
+        self._F, self._T = self._R.shape[:2]
+        self._channel_limits = channel_limits[::frequency_factor]
+        self._reset_grid_dependent_properties()
+        self._calculate_V()
+        self._calculate_hatR()
+        try:
+            for _ in range(number_of_iterations):
+                self._update_factors()
+                self._iteration += 1
+        finally:
+            # the full grid is restored on errors as well, with W and H of the last completed update
+            self._R, self._R_imag, self._F, self._T, self._channel_limits = R, R_imag, F, T, channel_limits
+            self._reset_grid_dependent_properties()
+            upsampled = {'W': repeat(self._W, frequency_factor, axis=0)[:F],
+                         'H': repeat(self._H, frame_factor, axis=0)[:T]}
+            self._W, self._H = W, H
+            self._set_factors({factor: value for factor, value in upsampled.items() if factor not in self._frozen})
+
+    def copy(self) -> 'NTFBase':
+        """
+        Returns
+        -------
+        model
+            Copy of the model with its own factors, hyperparameters, settings and random generator. The covariance
+            matrices, the direction grid, the Spherical Harmonic outer products and the einsum paths are shared with
+            this model instead of copied or recomputed, e.g. to fit it with other hyperparameters. The tensors derived
+            from the factors, e.g. V and hatR, are rebuilt instead of copied.
+        """
+        shared_names = [name for name in self.__dict__ if name in self._shared_names or name.endswith('_path')]
+        model = object.__new__(type(self))
+        model.__dict__.update(deepcopy({name: value for name, value in self.__dict__.items()
+                                        if name not in shared_names and name not in self._derived_names and
+                                        name != '_executor'}))
+        model.__dict__.update({name: self.__dict__[name] for name in shared_names})
+        model._executor = None
+        model._calculate_V()
+        model._calculate_XI()
+        model._calculate_hatR()
+        return model
+
+    def __getstate__(self) -> Dict[str, object]:
+        # the thread pool can not be pickled, e.g. to send the model to the processes of sweep, it is created again on
+        # its first use instead, as for copies
+        return dict(self.__dict__, _executor=None)
+
+    def __del__(self) -> None:
+        if self.__dict__.get('_executor') is not None:
+            self._executor.shutdown(wait=False)
+
+    def save_checkpoint(self, file: str, include_covariance_matrices: bool = False) -> None:
+        """
+        Saves the factors, the hyperparameters, the direction grid, the iteration count and the state of the random
+        generator to a compressed .npz file. The file is replaced atomically, hence an interrupted save keeps the
+        previous checkpoint.
+
+        Parameters
+        ----------
+        file
+            Path of the checkpoint file.
+        include_covariance_matrices
+            If True, the empirical covariance matrices are saved as well, otherwise the model has to be constructed
+            from the same input before loading.
+        """
+        state = {name: getattr(self, name) for name in self._state_names}
+        state['random_generator'] = dumps(self._rnd_gn.bit_generator.state)
+        if include_covariance_matrices:
+            state['_R'], state['_R_imag'] = self._R, self._R_imag
+        with open(file + '.tmp', 'wb') as checkpoint:
+            savez_compressed(checkpoint, **state)
+        replace(file + '.tmp', file)
+
+    def load_checkpoint(self, file: str, factors: Optional[str] = None) -> None:
+        """
+        Parameters
+        ----------
+        file
+            Path of a checkpoint file saved by save_checkpoint.
+        factors
+            If None, the whole saved state is restored to resume the fit. Otherwise only the listed factors are
+            loaded to warm-start a fit on new data, e.g. 'QWZ' from the previous segment of a recording. Loading Z
+            also loads the direction grid it refers to. Loading any of Q, W and H also loads the remaining components,
+            see prune_components, and the factors that are not loaded are reduced to them.
+        """
+        with load(file) as checkpoint:
+            state = {name: value.item() if value.ndim == 0 else value for name, value in checkpoint.items()}
+        if factors is not None:
+            if set(factors) & set('QWH'):
+                self._select_components(state['_component_indices'], ''.join(set('QWH') - set(factors)))
+            if 'Z' in factors:
+                self._D, self._directions = state['_D'], state['_directions']
+                self._patch_radius, self._patch_directions = state['_patch_radius'], state['_patch_directions']
+                self._reset_direction_dependent_properties()
+            self._set_factors({factor: state['_' + factor] for factor in factors})
+            return
+        if '_R' in state:
+            self._R, self._R_imag = state['_R'], state['_R_imag']
+            self._F, self._T = self._R.shape[:2]
+        self._rnd_gn.bit_generator.state = loads(state['random_generator'])
+        self._set_state(state)
+
+    def _state(self) -> Dict[str, object]:
+        return {name: deepcopy(getattr(self, name)) for name in self._state_names}
+
+    def _set_state(self, state: Dict[str, object]) -> None:
+        self._reset_cached_properties(*[name for name in dir(type(self)) if name not in self._state_names and
+                                        name != '_channel_limits' and
+                                        isinstance(getattr(type(self), name), cached_property)])
+        for name in self._state_names:
+            setattr(self, name, state[name])
+        if self._component_blocks is not None:
+            self._component_blocks = self._partition_blocks()
+        self._calculate_V()
+        self._calculate_XI()
+        self._calculate_hatR()
+
+    def fit(self, number_of_iterations: int, callback: Optional[Callable[['NTFBase'], None]] = None,
+            checkpoint_file: Optional[str] = None, checkpoint_period: int = 10) -> None:
+        """
+        Runs iterations until number_of_iterations iterations are completed in total, hence a fit resumed from a
+        checkpoint only runs the remaining ones.
+
+        Parameters
+        ----------
+        number_of_iterations
+            Total number of iterations.
+        callback
+            Function called with the model after every iteration, e.g. to log the cost function.
+        checkpoint_file
+            Path of the checkpoint file. If None, no checkpoints are saved. For details see: save_checkpoint.
+        checkpoint_period
+            Number of iterations between checkpoints.
+        """
+        while self._iteration < number_of_iterations:
+            self.iteration()
+            if callback is not None:
+                callback(self)
+            if checkpoint_file is not None and (self._iteration % checkpoint_period == 0 or
+                                                self._iteration == number_of_iterations):
+                self.save_checkpoint(checkpoint_file)
+
+    @observed
+    def fit_cascade(self, counterpart: 'NTFBase', number_of_iterations: int, maximum_counterpart_iterations: int = 100,
+                    tolerance: float = 1e-3, patience: int = 3,
+                    callback: Optional[Callable[['NTFBase'], None]] = None) -> None:
+        """
+        Fits a cheaper counterpart of the model first, e.g. EU for IS or EU_WLP for IS_WLP, until its cost function
+        plateaus, transfers its factors with initialize_from_model and finishes with iterations of the model itself.
+
+        Parameters
+        ----------
+        counterpart
+            Model constructed from the same covariance matrices with the same number of sources and components per
+            source.
+        number_of_iterations
+            Number of iterations of the model after the hand-off.
+        maximum_counterpart_iterations
+            Number of counterpart iterations after which the factors are handed off regardless of the cost function.
+        tolerance
+            Relative decrease of the counterpart cost function per iteration, below which an iteration counts as
+            stalled.
+        patience
+            Number of consecutive stalled iterations, after which the factors are handed off.
+        callback
+            Function called with the counterpart or the model after every iteration, e.g. to log the cost function.
+        """
+        cost, stalled = counterpart.cost_function, 0
+        while counterpart.number_of_iterations < maximum_counterpart_iterations and stalled < patience:
+            counterpart.iteration()
+            if callback is not None:
+                callback(counterpart)
+            previous_cost, cost = cost, counterpart.cost_function
+            stalled = stalled + 1 if previous_cost - cost < tolerance * abs(previous_cost) else 0
+        self.initialize_from_model(counterpart)
+        self.fit(self._iteration + number_of_iterations, callback)
+
+    @abstractmethod
+    def _XI_traces(self, f: slice) -> Tuple[ndarray, ndarray]:
+        raise NotImplementedError
+
+    def _Q_terms(self, f: slice) -> Tuple[ndarray, ...]:
+        return tuple(einsum('fk, tk, jft -> jk', self._W[f], self._H, traces, optimize=self._Q_path)
+                     for traces in self._XI_traces(f))
+
+    def _W_terms(self, f: slice) -> Tuple[ndarray, ...]:
+        if self._component_blocks is None:
+            return tuple(einsum('jk, tk, jft -> fk', self._Q, self._H, traces, optimize=self._W_path)
+                         for traces in self._XI_traces(f))
+        return tuple(concatenate([traces[j] @ self._H[:, block] for j, block in enumerate(self._component_blocks)],
+                                 axis=-1) for traces in self._XI_traces(f))
+
+    def _H_terms(self, f: slice) -> Tuple[ndarray, ...]:
+        if self._component_blocks is None:
+            return tuple(einsum('jk, fk, jft -> tk', self._Q, self._W[f], traces, optimize=self._H_path)
+                         for traces in self._XI_traces(f))
+        return tuple(concatenate([traces[j].T @ self._W[f, block] for j, block in enumerate(self._component_blocks)],
+                                 axis=-1) for traces in self._XI_traces(f))
 
     def iteration(self) -> None:
-        self.update_Q()
-        self.update_W()
-        self.update_H()
-        self.update_Z()
+        with self._single_threaded_blas():
+            self._iteration_body()
+
+    def _iteration_body(self) -> None:
+        try:
+            if self._is_minibatch_iteration():
+                self._minibatch_iteration()
+            else:
+                previous_factors = self._factors() if self._extrapolation else None
+                self._update_factors()
+                if self._extrapolation:
+                    self._extrapolate(previous_factors)
+        except LinAlgError as error:
+            # non-finite covariance matrices make the matrix inversions and decompositions fail before a check
+            if self._health_check is None:
+                raise
+            self._recover(f'{error} in iteration {self._iteration + 1}')
+            return
+        if self._direction_refinement is not None and 'Z' not in self._frozen and \
+                (self._iteration + 1) % self._direction_refinement[0] == 0:
+            self.refine_directions(*self._direction_refinement[1:])
+        if self._component_pruning is not None and (self._iteration + 1) % self._component_pruning[0] == 0:
+            self.prune_components(self._component_pruning[1])
+        self._iteration += 1
+        if self._health_check is not None and self._iteration % self._health_check[0] == 0:
+            self._check_health()
+
+    @observed
+    def _check_health(self) -> None:
+        non_finite = {factor: int((~isfinite(getattr(self, '_' + factor))).sum()) for factor in 'QWHZ'}
+        if not any(non_finite.values()):
+            self._healthy_state = self._state()
+            return
+        self._recover(f'non-finite entries after iteration {self._iteration}: ' + ', '.join(
+            f'{factor} {count} of {getattr(self, "_" + factor).size}' for factor, count in non_finite.items() if count))
+
+    def _recover(self, diagnostic: str) -> None:
+        if self._restarts < self._health_check[1] and (
+                self._exponent != 1 or self._extrapolation or self._minibatch is not None):
+            self._restarts += 1
+            self._exponent, self._extrapolation = 1., False
+            self._set_state(deepcopy(self._healthy_state))
+            return
+        raise FloatingPointError(f'{type(self).__name__} diverged, {diagnostic}. The last finite state is from '
+                                 f'iteration {self._healthy_state["_iteration"]}.')
+
+    def _update_factors(self) -> None:
+        for factor in sub('[QWH]+', lambda run: run.group() * self._inner_repetitions, self._update_order):
+            if self._is_scheduled(factor):
+                with stage(type(self).__name__ + '.update_' + factor):
+                    getattr(self, 'update_' + factor)()
+
+    @observed
+    def _minibatch_iteration(self) -> None:
+        number_of_frames, decay, _ = self._minibatch
+        if len(self._frame_queue) < number_of_frames:
+            self._frame_queue = self._rnd_gn.permutation(self._T)
+        frames, self._frame_queue = sort(self._frame_queue[:number_of_frames]), self._frame_queue[number_of_frames:]
+        R, R_imag, H, T = self._R, self._R_imag, self._H, self._T
+        previous_factors = {factor: deepcopy(getattr(self, '_' + factor)) for factor in 'QWZ'}
+        self._R, self._R_imag, self._H, self._T = R[:, frames], R_imag[:, frames], H[frames], number_of_frames
+        try:
+            self._reset_grid_dependent_properties()
+            self._calculate_V()
+            self._calculate_hatR()
+            self._update_factors()
+            H[frames] = self._H
+        finally:
+            # the full grid is restored on errors as well, e.g. before a restart from the last passed health check
+            self._R, self._R_imag, self._H, self._T = R, R_imag, H, T
+            self._reset_grid_dependent_properties()
+        step_size = (self._iteration + 1) ** -decay
+        self._set_factors({factor: (1 - step_size) * value + step_size * getattr(self, '_' + factor)
+                           for factor, value in previous_factors.items() if factor not in self._frozen})
+
+    def _factors(self) -> Dict[str, ndarray]:
+        return {factor: deepcopy(getattr(self, '_' + factor)) for factor in 'QWHZ'}
+
+    def _set_factors(self, factors: Dict[str, ndarray]) -> None:
+        for factor, value in factors.items():
+            setattr(self, '_' + factor, value)
+        self._reset_cached_properties('_accepted_cost')
+        self._normalize_QWHZ()
+        self._calculate_V()
+        self._calculate_XI()
+        self._calculate_hatR()
+
+    @observed
+    def _extrapolate(self, previous_factors: Dict[str, ndarray]) -> None:
+        factors, accepted_cost = self._factors(), self._accepted_cost
+        self._set_factors({factor: maximum(value + self._beta * (value - previous_factors[factor]), finfo(float).eps)
+                           for factor, value in factors.items() if factor not in self._frozen})
+        cost = self.cost_function
+        if not isfinite(cost) or cost > accepted_cost:
+            self._set_factors(factors)
+            self._accepted_cost = self.cost_function
+            self._beta, self._beta_max = self._beta / 1.5, self._beta
+        else:
+            self._accepted_cost = cost
+            self._beta, self._beta_max = min(self._beta_max, 1.01 * self._beta), min(1., 1.005 * self._beta_max)
+
+    def _einsum_path(self, subscripts: str, *operands: ndarray) -> List[Union[str, Tuple[int]]]:
+        path = einsum_path(subscripts, *operands, optimize='optimal')[0]
+        self._contractions[subscripts] = (
+            [operand.shape for operand in operands], result_type(*operands).itemsize, path)
+        return path
+
+    def _reset_cached_properties(self, *names: str) -> None:
+        for name in names:
+            self.__dict__.pop(name, None)
+
+    def _reset_direction_dependent_properties(self) -> None:
+        self._reset_cached_properties('_S', '_XI_path', '_Z_path')
+
+    def _reset_grid_dependent_properties(self) -> None:
+        self._reset_cached_properties('_accepted_cost', '_frequency_blocks')
+
+    def _update_ratio(self, numerator: ndarray, denominator: ndarray) -> ndarray:
+        return (numerator / maximum(denominator, self._denominator_floor)) ** self._exponent
+
+    def _is_minibatch_iteration(self) -> bool:
+        return self._minibatch is not None and (
+            self._minibatch[2] is None or (self._iteration + 1) % self._minibatch[2] != 0)
+
+    def _is_scheduled(self, factor: str) -> bool:
+        return (factor not in self._frozen and self._iteration % self._update_periods.get(factor, 1) == 0 and
+                self._iteration < self._update_limits.get(factor, inf))
 
     @abstractmethod
     def update_Q(self) -> None:
@@ -133,15 +930,31 @@ class NTFBase(ABC):
         self._calculate_XI()
         self._calculate_hatR()
 
+    @property
+    def component_indices(self) -> ndarray:
+        return deepcopy(self._component_indices)
+
     @property
     def covariance_matrices(self) -> ndarray:
-        return deepcopy(self._hatR)
+        return unpack_covariance_matrices(self._hatR)
 
     @property
     @abstractmethod
     def cost_function(self) -> float:
         raise NotImplementedError
 
+    @property
+    def directions(self) -> ndarray:
+        return deepcopy(self._directions)
+
+    @property
+    def factors(self) -> Dict[str, ndarray]:
+        return self._factors()
+
+    @property
+    def number_of_iterations(self) -> int:
+        return self._iteration
+
     @property
     def spatial_covariance_matrices(self) -> ndarray:
         return deepcopy(self._XI)
@@ -150,18 +963,57 @@ class NTFBase(ABC):
     def spectrograms(self) -> ndarray:
         return deepcopy(self._V)
 
+    @cached_property
+    def _accepted_cost(self) -> float:
+        # cost of the current factors, which the extrapolated factors have to undercut, see set_acceleration. It is
+        # reset whenever the factors, the grid or the hyperparameters are replaced outside of the iterations
+        return self.cost_function
+
+    @cached_property
+    def _channel_limits(self) -> ndarray:
+        return full(self._F, self._L)
+
+    @cached_property
+    def _component_indices(self) -> ndarray:
+        return arange(self._K)
+
+    @cached_property
+    def _directions(self) -> ndarray:
+        return fibonacci_sphere(self._D)
+
+    @cached_property
+    def _frequency_blocks(self) -> List[slice]:
+        boundaries = unique(concatenate((linspace(0, self._F, min(self._n_threads, self._F) + 1).astype(int),
+                                         flatnonzero(diff(self._channel_limits)) + 1)))
+        return [slice(start, stop) for start, stop in zip(boundaries[:-1], boundaries[1:])]
+
+    @cached_property
+    def _H_path(self) -> List[Union[str, Tuple[int]]]:
+        return self._einsum_path('jk, fk, jft -> tk', self._Q, self._W, self._V)
+
     @cached_property
     def _hatR_path(self) -> List[Union[str, Tuple[int]]]:
-        return einsum_path('jft, jab -> jftab', self._V, self._XI, optimize='optimal')[0]
+        return self._einsum_path('jft, jp -> jftp', self._V, pack_covariance_matrices(self._XI))
 
     @cached_property
     def _K(self) -> int:
         return int(self._J * self._Kpj)
 
+    @cached_property
+    def _patch_directions(self) -> ndarray:
+        return zeros(self._D, dtype=bool)
+
+    @cached_property
+    def _patch_radius(self) -> float:
+        return sqrt(4 * pi / self._D) / 2
+
+    @cached_property
+    def _Q_path(self) -> List[Union[str, Tuple[int]]]:
+        return self._einsum_path('fk, tk, jft -> jk', self._W, self._H, self._V)
+
     @cached_property
     def _S(self) -> ndarray:
-        doa_gc = fibonacci_sphere(self._D)
-        doa_gs = cartesian_to_spherical(doa_gc)
+        doa_gs = cartesian_to_spherical(self._directions)
         order = number_of_channels_to_order(self._L)
         shm = matrix(doa_gs[:, 1:], order)
         S = shm[..., None] @ shm[:, None]
@@ -170,8 +1022,22 @@ class NTFBase(ABC):
 
     @cached_property
     def _V_path(self) -> List[Union[str, Tuple[int]]]:
-        return einsum_path('jk, fk, tk -> jft', self._Q, self._W, self._H, optimize='optimal')[0]
+        return self._einsum_path('jk, fk, tk -> jft', self._Q, self._W, self._H)
+
+    @cached_property
+    def _W_path(self) -> List[Union[str, Tuple[int]]]:
+        return self._einsum_path('jk, tk, jft -> fk', self._Q, self._H, self._V)
 
     @cached_property
     def _XI_path(self) -> List[Union[str, Tuple[int]]]:
-        return einsum_path('jd, dab -> jab', self._Z, self._S, optimize='optimal')[0]
+        return self._einsum_path('jd, dab -> jab', self._Z, self._S)
+
+    @cached_property
+    def _XI_trace_path(self) -> List[Union[str, Tuple[int]]]:
+        R = broadcast_to(self._XI[0], (self._F, self._T, self._L, self._L))
+        return self._einsum_path('ftab, jab -> jft', R, self._XI)
+
+    @cached_property
+    def _Z_path(self) -> List[List[Union[str, Tuple[int]]]]:
+        R = broadcast_to(self._XI[0], (self._F, self._T, self._L, self._L))
+        return [self._einsum_path('jft, ftab, dab -> jd', self._V, R, self._S)]
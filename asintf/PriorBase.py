@@ -4,14 +4,37 @@ from numpy import ndarray, eye, arange, einsum, trace, asarray, isfinite, argmax
 from numpy.linalg import norm
 from numpy.linalg import pinv
 
+from asintf.cache import cached
 from asintf.geometry import cartesian_to_spherical
+from asintf.profiling import observed
 from asintf.reconstruction import mimo_pwd, pwd_mimo_mwf
 from asintf.spherical_harmonics import matrix, number_of_channels_to_order
 from asintf.wishart import pdf
 
 
 class PriorBase(ABC):
+    def set_degrees_of_freedom(self, degrees_of_freedom: float) -> None:
+        """
+        Parameters
+        ----------
+        degrees_of_freedom
+            Degrees of freedom of the Wishart distribution.
+        """
+        self._nu = degrees_of_freedom
+        self._reset_cached_properties('_accepted_cost')
+
+    def set_direct_to_reverb_ratio(self, direct_to_reverb_ratio: float) -> None:
+        """
+        Parameters
+        ----------
+        direct_to_reverb_ratio
+            Direct-to-reverb magnitude ratio. The prior matrices are recomputed on their next use.
+        """
+        self._dtrr = direct_to_reverb_ratio
+        self._reset_cached_properties('_Psi', '_Psiinv', '_trPsiinvS', '_diagPsi', '_diagPsiinv', '_accepted_cost')
+
     @staticmethod
+    @observed
     def _calculate_prior_matrix(directions_of_arrival_cartesian: ndarray, number_of_channels: int,
                                 direct_to_reverb_ratio: float) -> ndarray:
         directions_of_arrival_spherical = cartesian_to_spherical(directions_of_arrival_cartesian)
@@ -24,6 +47,8 @@ class PriorBase(ABC):
         return Psi
 
     @staticmethod
+    @observed
+    @cached
     def _estimate_direct_to_reverb_ratio(stft: ndarray, directions_of_arrival_cartesian: ndarray) -> float:
         number_of_channels = stft.shape[0]
         order = number_of_channels_to_order(number_of_channels)
@@ -36,6 +61,8 @@ class PriorBase(ABC):
         return direct_to_reverb_ratio
 
     @staticmethod
+    @observed
+    @cached
     def _estimate_degrees_of_freedom(stft: ndarray, direct_to_reverb_ratio: float,
                                      directions_of_arrival_cartesian: ndarray) -> float:
         number_of_channels, number_of_frequencies, number_of_frames = stft.shape
@@ -68,3 +95,15 @@ class PriorBase(ABC):
         nu_grid = nu_grid[indices]
         nu = nu_grid[argmax(probability_list)]
         return nu.item()
+
+
+class EUPriorBase(PriorBase):
+    def set_standard_deviation(self, standard_deviation: float) -> None:
+        """
+        Parameters
+        ----------
+        standard_deviation
+            Standard deviation of the complex Gaussian distribution.
+        """
+        self._std = standard_deviation
+        self._reset_cached_properties('_accepted_cost')
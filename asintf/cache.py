@@ -0,0 +1,207 @@
+from functools import wraps
+from hashlib import blake2b
+from importlib.metadata import PackageNotFoundError, version
+from inspect import signature
+from os import getpid, listdir, makedirs, replace, rename, utime
+from os.path import getmtime, getsize, isdir, join
+from shutil import rmtree
+from types import CodeType
+from typing import Callable, List, Optional, Tuple
+
+from numpy import __version__ as numpy_version, ascontiguousarray, load, ndarray, save
+
+# bumped with changes of the cached results that the bytecode of the cached functions does not reflect
+CACHE_VERSION = 1
+
+_cache = None
+
+
+class Cache:
+    """
+    Content-addressed on-disk cache of preprocessing results, i.e., the STFT analysis, the magnitude compression, the
+    covariance matrices and the blind prior hyperparameter estimates. Every result is stored under a hash of the
+    function, its input arrays and its parameters, hence model comparison runs on the same mixture, e.g. all model
+    classes with the same STFT parameters and directions of arrival, compute each of them once. The cache is active
+    within a with statement only, otherwise the instrumented functions are called directly.
+
+    The key covers the code of the cached function, i.e., its bytecode, constants and names, and the versions of the
+    package and numpy, but not the code of the functions it calls, hence the cache should be cleared after changing
+    them in a source checkout.
+
+    Attributes
+    ----------
+    hits
+        Number of results loaded from the cache.
+    misses
+        Number of results computed and stored.
+    """
+
+    def __init__(self, directory: str, maximum_bytes: int = 2 ** 32, memory_map: bool = True) -> None:
+        """
+        Parameters
+        ----------
+        directory
+            Directory of the cache, created if it does not exist. It can be shared by processes and runs.
+        maximum_bytes
+            Size limit of the stored results. The least recently used ones are evicted after storing a new one.
+        memory_map
+            If True, cached arrays are returned as read-only memory maps of the .npy files, otherwise they are read
+            into memory.
+        """
+        self.hits = 0
+        self.misses = 0
+        self._directory = directory
+        self._maximum_bytes = maximum_bytes
+        self._memory_map = memory_map
+        makedirs(directory, exist_ok=True)
+
+    def __enter__(self) -> 'Cache':
+        global _cache
+        _cache = self
+        return self
+
+    def __exit__(self, *exception_info) -> None:
+        global _cache
+        _cache = None
+
+    def clear(self) -> None:
+        for entry in listdir(self._directory):
+            rmtree(join(self._directory, entry), ignore_errors=True)
+
+    def load(self, key: str) -> Optional[Tuple[object, ...]]:
+        """
+        Parameters
+        ----------
+        key
+            Key of the result.
+
+        Returns
+        -------
+        values
+            Stored values, or None if the key is not in the cache.
+        """
+        entry = join(self._directory, key)
+        try:
+            utime(entry)
+            values = tuple(load(join(entry, f'{index}.npy'), mmap_mode='r' if self._memory_map else None)
+                           for index in range(len(listdir(entry))))
+        except (FileNotFoundError, ValueError):
+            return None
+        self.hits += 1
+        return tuple(value.item() if value.ndim == 0 else value for value in values)
+
+    def store(self, key: str, values: Tuple[object, ...]) -> None:
+        """
+        Parameters
+        ----------
+        key
+            Key of the result.
+        values
+            Arrays or scalars to be stored. The entry is written to a temporary directory and renamed, hence
+            concurrent writers and interrupted runs never leave a partial entry.
+        """
+        self.misses += 1
+        entry = join(self._directory, key)
+        temporary_entry = f'{entry}.{getpid()}.tmp'
+        makedirs(temporary_entry, exist_ok=True)
+        for index, value in enumerate(values):
+            save(join(temporary_entry, f'{index}.npy'), value)
+        try:
+            rename(temporary_entry, entry)
+        except OSError:
+            rmtree(temporary_entry, ignore_errors=True)
+        self._evict()
+
+    @property
+    def size(self) -> int:
+        return sum(self._entry_size(entry) for entry in self._entries())
+
+    def _entries(self) -> List[str]:
+        return [entry for entry in listdir(self._directory)
+                if not entry.endswith('.tmp') and isdir(join(self._directory, entry))]
+
+    def _entry_size(self, entry: str) -> int:
+        directory = join(self._directory, entry)
+        return sum(getsize(join(directory, file)) for file in listdir(directory))
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries(), key=lambda entry: getmtime(join(self._directory, entry)), reverse=True)
+        size = 0
+        for entry in entries:
+            try:
+                size += self._entry_size(entry)
+                if size > self._maximum_bytes:
+                    # renaming first keeps readers from loading a partially removed entry
+                    evicted = join(self._directory, f'{entry}.{getpid()}.tmp')
+                    replace(join(self._directory, entry), evicted)
+                    rmtree(evicted, ignore_errors=True)
+            except OSError:
+                # evicted by another process sharing the directory
+                continue
+
+
+def key(function: Callable, *args, **kwargs) -> str:
+    """
+    Parameters
+    ----------
+    function
+        Cached function.
+    args, kwargs
+        Arguments of the call. Arrays are hashed by their data type, shape and content, other values by their
+        representation.
+
+    Returns
+    -------
+    key
+        Hexadecimal hash of the function and its arguments.
+    """
+    arguments = signature(function).bind(*args, **kwargs)
+    arguments.apply_defaults()
+    digest = blake2b(digest_size=20)
+    digest.update(f'{CACHE_VERSION} {_package_version()} {numpy_version}'.encode())
+    digest.update(f'{function.__module__}.{function.__qualname__}'.encode())
+    _update_code(digest, function.__code__)
+    for name, value in arguments.arguments.items():
+        digest.update(name.encode())
+        if isinstance(value, ndarray):
+            digest.update(f'{value.dtype.str}{value.shape}'.encode())
+            digest.update(ascontiguousarray(value).data)
+        else:
+            digest.update(repr(value).encode())
+    return digest.hexdigest()
+
+
+def _update_code(digest: blake2b, code: CodeType) -> None:
+    # the file name and the line numbers are left out, hence moving a function keeps its results
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode())
+    for constant in code.co_consts:
+        if isinstance(constant, CodeType):
+            _update_code(digest, constant)
+        else:
+            digest.update(repr(constant).encode())
+
+
+def _package_version() -> str:
+    try:
+        return version('asintf')
+    except PackageNotFoundError:
+        return 'source'
+
+
+def cached(function: Callable) -> Callable:
+    """
+    Decorator storing the results of a pure function in the active cache.
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        if _cache is None:
+            return function(*args, **kwargs)
+        function_key = key(function, *args, **kwargs)
+        values = _cache.load(function_key)
+        if values is None:
+            result = function(*args, **kwargs)
+            _cache.store(function_key, result if isinstance(result, tuple) else (result,))
+            return result
+        return values if len(values) > 1 else values[0]
+    return wrapper
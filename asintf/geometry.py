@@ -1,6 +1,6 @@
 from typing import Optional
 
-from numpy import arccos, arctan2, cos, ndarray, pi, sin, sqrt, zeros
+from numpy import absolute, arange, arccos, arctan2, cos, cross, einsum, ndarray, pi, sin, sqrt, stack, where, zeros
 from numpy.linalg import norm
 
 
@@ -50,3 +50,33 @@ def fibonacci_sphere(number_of_points: Optional[int] = 162) -> ndarray:
         cartesian_coordinates[i, 0] = r * cos(phi)
         cartesian_coordinates[i, 2] = r * sin(phi)
     return cartesian_coordinates
+
+
+def fibonacci_cap(cartesian_coordinates: ndarray, angular_radius: float, number_of_points: int) -> ndarray:
+    """
+    Returns cartesian coordinates of points distributed quasi-uniformly on spherical caps around given directions.
+
+    Parameters
+    ----------
+    cartesian_coordinates
+        Cartesian coordinates of the cap centres. Shape: [direction x 3 (x, y, z)]
+    angular_radius
+        Angular radius of the caps in radians.
+    number_of_points
+        Number of points per cap.
+
+    Returns
+    -------
+    cartesian_coordinates
+        Cartesian coordinates. Shape: [direction x point x 3 (x, y, z)]
+    """
+    index = arange(number_of_points) + 0.5
+    theta = arccos(1 - (1 - cos(angular_radius)) * index / number_of_points)
+    phi = index * pi * (3. - sqrt(5.))
+    cap = stack((sin(theta) * cos(phi), sin(theta) * sin(phi), cos(theta)), axis=-1)
+    centres = cartesian_coordinates / norm(cartesian_coordinates, axis=1)[:, None]
+    helpers = where(absolute(centres[:, :1]) < 0.9, [[1., 0., 0.]], [[0., 1., 0.]])
+    first_axes = cross(helpers, centres)
+    first_axes /= norm(first_axes, axis=1)[:, None]
+    second_axes = cross(centres, first_axes)
+    return einsum('pa, dab -> dpb', cap, stack((first_axes, second_axes, centres), axis=1))
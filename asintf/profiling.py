@@ -0,0 +1,135 @@
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from json import dump
+from os import getpid
+from threading import get_ident, local
+from time import perf_counter_ns
+from typing import Callable, ContextManager, Dict, Iterator
+
+_observer = None
+
+
+class Observer:
+    """
+    Records the wall time, the allocated bytes and the peak memory of the instrumented stages, i.e., the factor
+    updates, the rebuilds of V, XI and hatR, the frequency block contractions, the prior hyperparameter estimators and
+    the stft and reconstruction functions. The observer is active within a with statement only, otherwise the
+    instrumentation reduces to a single check per stage.
+
+    Attributes
+    ----------
+    events
+        Recorded stages in the Chrome trace event format.
+    """
+
+    def __init__(self, trace_memory: bool = True) -> None:
+        """
+        Parameters
+        ----------
+        trace_memory
+            If True, memory is traced with tracemalloc, which slows down the allocations. The allocated bytes are the
+            net change of the traced memory, the peak is the largest traced memory of the process during the stage.
+        """
+        self.events = []
+        self._trace_memory = trace_memory
+        self._stacks = local()
+        self._started_tracing = False
+
+    def __enter__(self) -> 'Observer':
+        global _observer
+        # tracing started elsewhere is left running
+        self._started_tracing = self._trace_memory and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        _observer = self
+        return self
+
+    def __exit__(self, *exception_info) -> None:
+        global _observer
+        _observer = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        stack = self._stacks.__dict__.setdefault('stack', [])
+        if self._trace_memory:
+            start_memory, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1][0] = max(stack[-1][0], peak)
+            tracemalloc.reset_peak()
+        else:
+            start_memory = 0
+        frame = [start_memory]
+        stack.append(frame)
+        start = perf_counter_ns()
+        try:
+            yield
+        finally:
+            duration = perf_counter_ns() - start
+            stack.pop()
+            end_memory, peak = tracemalloc.get_traced_memory() if self._trace_memory else (0, 0)
+            peak = max(frame[0], peak)
+            if stack:
+                stack[-1][0] = max(stack[-1][0], peak)
+            self.events.append({'name': name, 'ph': 'X', 'ts': start / 1e3, 'dur': duration / 1e3, 'pid': getpid(),
+                                'tid': get_ident(), 'args': {'allocated_bytes': end_memory - start_memory,
+                                                             'peak_bytes': peak}})
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns
+        -------
+        summary
+            Number of calls, total wall time in seconds and largest peak memory in bytes of every stage.
+        """
+        summary = defaultdict(lambda: {'calls': 0, 'time': 0., 'peak_bytes': 0})
+        for event in self.events:
+            stage_summary = summary[event['name']]
+            stage_summary['calls'] += 1
+            stage_summary['time'] += event['dur'] / 1e6
+            stage_summary['peak_bytes'] = max(stage_summary['peak_bytes'], event['args']['peak_bytes'])
+        return dict(summary)
+
+    def export_chrome_trace(self, file: str) -> None:
+        """
+        Parameters
+        ----------
+        file
+            Path of the JSON file, which can be opened in chrome://tracing or https://ui.perfetto.dev.
+        """
+        with open(file, 'w') as trace:
+            dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, trace)
+
+
+def stage(name: str) -> ContextManager[None]:
+    """
+    Parameters
+    ----------
+    name
+        Name of the stage recorded by the active observer.
+
+    Returns
+    -------
+    context_manager
+        Context manager timing the enclosed code, if an observer is active.
+    """
+    if _observer is None:
+        return nullcontext()
+    return _observer.stage(name)
+
+
+def observed(function: Callable) -> Callable:
+    """
+    Decorator recording every call of the function as a stage of the active observer.
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        if _observer is None:
+            return function(*args, **kwargs)
+        with _observer.stage(function.__qualname__):
+            return function(*args, **kwargs)
+    return wrapper
@@ -1,8 +1,16 @@
-from numpy import einsum, eye, ndarray
+from typing import Optional, Tuple
+
+from numpy import (asarray, concatenate, diff, divide, einsum, flatnonzero, ix_, minimum, ndarray, repeat, zeros,
+                   zeros_like)
 from numpy.linalg import pinv
 
+from asintf.profiling import observed
+from asintf.stft import fill_skipped
+
 
-def mimo_mwf(stft: ndarray, covariance_matrices: ndarray) -> ndarray:
+@observed
+def mimo_mwf(stft: ndarray, covariance_matrices: ndarray, order_limits: Optional[ndarray] = None,
+             active_cells: Optional[Tuple[ndarray, ndarray]] = None, pass_through: bool = False) -> ndarray:
     """
     Multiple-Input Multiple-Output Multichannel Wiener Filter.
 
@@ -12,15 +20,44 @@ def mimo_mwf(stft: ndarray, covariance_matrices: ndarray) -> ndarray:
         Short Time Fourier Transform coefficients. Shape: [channel x frequency x frame]
     covariance_matrices
         Covariance matrices. Shape: [source x frequency x frame x channel x channel]
+    order_limits
+        Maximum Spherical Harmonic order per frequency bin. The filter of each bin only uses the channels up to the
+        given order, the remaining channels are scaled with the single channel Wiener gain of the omnidirectional
+        channel. Shape: [frequency]
+    active_cells
+        Masks of the active frequency bins and frames, if the covariance matrices were estimated on the compacted
+        grid only. For details see: stft.energy_mask.
+    pass_through
+        If True, the skipped bins and frames of each source image contain the mixture divided by the number of
+        sources, otherwise zeros.
 
     Returns
     -------
     source_signals
         Reconstructed source images. Shape: [source x channel x frequency x frame]
     """
-    return einsum('ftab, jftbc, cft-> jaft', pinv(covariance_matrices.sum(0)), covariance_matrices, stft, optimize=True)
-
-
+    if active_cells is not None:
+        active_bins, active_frames = active_cells
+        J = covariance_matrices.shape[0]
+        fill_values = repeat(stft[None] / J, J, axis=0) if pass_through else zeros((J,) + stft.shape, stft.dtype)
+        return fill_skipped(
+            mimo_mwf(stft[(slice(None), *ix_(active_bins, active_frames))], covariance_matrices,
+                     None if order_limits is None else asarray(order_limits)[active_bins]),
+            active_bins, active_frames, fill_values)
+    if order_limits is None:
+        return einsum(
+            'ftab, jftbc, cft-> jaft', pinv(covariance_matrices.sum(0)), covariance_matrices, stft, optimize=True)
+    channel_limits = minimum((asarray(order_limits) + 1) ** 2, stft.shape[0])
+    boundaries = concatenate(([0], flatnonzero(diff(channel_limits)) + 1, [stft.shape[1]]))
+    gains = covariance_matrices[..., 0, 0].real / covariance_matrices[..., 0, 0].real.sum(0)
+    source_signals = einsum('jft, lft -> jlft', gains, stft)
+    for start, stop in zip(boundaries[:-1], boundaries[1:]):
+        c = slice(0, channel_limits[start])
+        source_signals[:, c, start:stop] = mimo_mwf(stft[c, start:stop], covariance_matrices[:, start:stop, :, c, c])
+    return source_signals
+
+
+@observed
 def pwd(stft: ndarray, steering_vectors: ndarray) -> ndarray:
     """
     Plane Wave Decomposition beamformer.
@@ -40,6 +77,7 @@ def pwd(stft: ndarray, steering_vectors: ndarray) -> ndarray:
     return einsum('jftl, lft -> jft', steering_vectors, stft, optimize=True)
 
 
+@observed
 def mimo_pwd(stft: ndarray, steering_vectors: ndarray) -> ndarray:
     """
     Multiple-Input Multiple-Output Plane Wave Decomposition beamformer.
@@ -59,9 +97,13 @@ def mimo_pwd(stft: ndarray, steering_vectors: ndarray) -> ndarray:
     return einsum('jftl, jft -> jlft', steering_vectors, pwd(stft, steering_vectors), optimize=True)
 
 
+@observed
 def pwd_mimo_mwf(stft: ndarray, steering_vectors: ndarray) -> ndarray:
     """
-    Plane Wave Decomposition beamformer followed by Multiple-Input Multiple-Output Multichannel Wiener Filter.
+    Plane Wave Decomposition beamformer followed by Multiple-Input Multiple-Output Multichannel Wiener Filter. The
+    covariance matrices of the sources are the beamformer output magnitudes times the identity, hence the filter
+    reduces to a scalar mask per source, i.e., the source magnitude over the sum of all magnitudes, and is applied
+    without forming or inverting any channel x channel matrices.
 
     Parameters
     ----------
@@ -75,5 +117,7 @@ def pwd_mimo_mwf(stft: ndarray, steering_vectors: ndarray) -> ndarray:
     source_signals
         Reconstructed source images. Shape: [source x channel x frequency x frame]
     """
-    return mimo_mwf(
-        stft, abs(pwd(stft, steering_vectors))[..., None, None] * eye(steering_vectors.shape[-1])[None, None, None])
+    magnitudes = abs(pwd(stft, steering_vectors))
+    total_magnitudes = magnitudes.sum(axis=0)
+    masks = divide(magnitudes, total_magnitudes, out=zeros_like(magnitudes), where=total_magnitudes > 0)
+    return einsum('jft, lft -> jlft', masks, stft)
@@ -0,0 +1,132 @@
+import tracemalloc
+from inspect import signature
+from math import prod
+from time import perf_counter
+from typing import Dict, List, Sequence, Tuple, Type, Union
+
+from numpy import broadcast_to, einsum, full, zeros
+from numpy.random import default_rng
+
+from asintf.NTFBase import NTFBase
+from asintf.stft import number_of_channels_to_packed_size, pack_covariance_matrices
+
+
+def estimate_resources(model_class: Type[NTFBase], number_of_frequencies: int, number_of_frames: int,
+                       number_of_channels: int, number_of_sources: int, components_per_source: int,
+                       number_of_directions: int, *arguments, calibration_size: int = 64,
+                       repetitions: int = 3) -> Dict[str, object]:
+    """
+    Predicts the memory and the time per iteration of a model without allocating its tensors, e.g. to choose the
+    machine for a separation job. The tensors kept by the model and the intermediates of the einsum contraction
+    plans used by its iterations are sized for the full problem, planned as by the model itself. The time and the
+    temporary memory of the construction and an iteration, traced with tracemalloc, are calibrated on random
+    covariance matrices of at most calibration_size and 2 * calibration_size frequency bins and frames, and
+    extrapolated linearly in the number of time-frequency bins.
+
+    Parameters
+    ----------
+    model_class
+        Model class, e.g. IS_WLP.
+    number_of_frequencies
+        Number of frequency bins.
+    number_of_frames
+        Number of frames.
+    number_of_channels
+        Number of channels.
+    number_of_sources
+        Number of sources.
+    components_per_source
+        Number of components per source.
+    number_of_directions
+        Number of directions.
+    arguments
+        Remaining constructor arguments, e.g. the directions of arrival and the hyperparameters of the prior models.
+    calibration_size
+        Number of frequency bins and frames of the smaller calibration model.
+    repetitions
+        Number of timed iterations per calibration model.
+
+    Returns
+    -------
+    estimate
+        tensors: bytes per tensor kept by the model, contractions: bytes of the largest intermediate or output per
+        einsum subscripts, construction_bytes: peak memory of the construction and the first iteration,
+        workspace_bytes: temporary memory of an iteration, peak_bytes: the larger of the construction and the sum
+        of the tensors plus the larger of the workspace and the largest contraction, seconds_per_iteration: time of
+        an iteration with a single thread.
+    """
+    F, T, L, J = number_of_frequencies, number_of_frames, number_of_channels, number_of_sources
+    (small_bins, _, small_seconds, *small_bytes), (large_bins, model, large_seconds, *large_bytes) = [
+        _calibrate(model_class, min(F, size), min(T, size), L, J, components_per_source, number_of_directions,
+                   arguments, repetitions) for size in (calibration_size, 2 * calibration_size)]
+
+    def extrapolate(small: float, large: float) -> float:
+        if large_bins == small_bins:
+            return large * F * T / large_bins
+        return max(large + (large - small) * (F * T - large_bins) / (large_bins - small_bins), 0.)
+
+    sizes = {'J': J, 'K': len(model._component_indices), 'D': number_of_directions, 'F': F, 'T': T, 'L': L,
+             'P': number_of_channels_to_packed_size(L), 'O': number_of_channels_to_packed_size(L) - L}
+    dry_model = model.copy()
+    dry_model._F, dry_model._T, dry_model._channel_limits, dry_model._contractions = F, T, full(F, L), {}
+    path_names = [name for name in model.__dict__ if name.endswith('_path')]
+    dry_model._reset_cached_properties('_frequency_blocks', *path_names)
+    tensors = {}
+    for name, dimensions in model_class._tensors.items():
+        dtype = getattr(model, name).dtype
+        shape = tuple(sizes[dimension] for dimension in dimensions)
+        setattr(dry_model, name, broadcast_to(zeros((), dtype), shape))
+        tensors[name] = getattr(dry_model, name).nbytes
+    for name in path_names:
+        getattr(dry_model, name)
+    contractions = {subscripts: _largest_intermediate(subscripts, shapes, path) * itemsize
+                    for subscripts, (shapes, itemsize, path) in dry_model._contractions.items()}
+    construction_bytes, workspace_bytes = [int(extrapolate(small, large))
+                                           for small, large in zip(small_bytes, large_bytes)]
+    peak_bytes = max(construction_bytes, sum(tensors.values()) + max(workspace_bytes, *contractions.values()))
+    return {'tensors': tensors, 'contractions': contractions, 'construction_bytes': construction_bytes,
+            'workspace_bytes': workspace_bytes, 'peak_bytes': peak_bytes,
+            'seconds_per_iteration': extrapolate(small_seconds, large_seconds)}
+
+
+def _calibrate(model_class: Type[NTFBase], F: int, T: int, L: int, J: int, components_per_source: int,
+               number_of_directions: int, arguments: Sequence[object],
+               repetitions: int) -> Tuple[int, NTFBase, float, int, int]:
+    random_generator = default_rng(0)
+    stft = random_generator.standard_normal((L, F, T)) + 1j * random_generator.standard_normal((L, F, T))
+    if 'stft' not in signature(model_class).parameters:
+        stft = pack_covariance_matrices(einsum('aft, bft -> ftab', stft, stft.conj()))
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    model = model_class(stft, J, components_per_source, number_of_directions, *arguments,
+                        random_generator=random_generator)
+    model.iteration()
+    construction_bytes = tracemalloc.get_traced_memory()[1] - start_memory
+    start_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    model.iteration()
+    workspace_bytes = tracemalloc.get_traced_memory()[1] - start_memory
+    if not tracing:
+        tracemalloc.stop()
+    times = []
+    for _ in range(repetitions):
+        start = perf_counter()
+        model.iteration()
+        times.append(perf_counter() - start)
+    return F * T, model, min(times), construction_bytes, workspace_bytes
+
+
+def _largest_intermediate(subscripts: str, shapes: Sequence[Tuple[int, ...]],
+                          path: List[Union[str, Tuple[int]]]) -> int:
+    inputs, output = subscripts.replace(' ', '').split('->')
+    terms = inputs.split(',')
+    sizes = {index: size for term, shape in zip(terms, shapes) for index, size in zip(term, shape)}
+    largest = 0
+    for contraction in path[1:]:
+        contracted = ''.join(terms.pop(position) for position in sorted(contraction, reverse=True))
+        terms.append(''.join(set(contracted) & set(''.join(terms) + output)))
+        largest = max(largest, prod(sizes[index] for index in terms[-1]))
+    return largest
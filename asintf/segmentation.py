@@ -0,0 +1,108 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Tuple
+
+from numpy import arange, einsum, finfo, linspace, maximum, ndarray, ones, pad, sqrt, zeros
+from scipy.optimize import linear_sum_assignment
+
+
+def segment_boundaries(number_of_samples: int, segment_length: int, overlap: int) -> List[Tuple[int, int]]:
+    """
+    Splits a recording into overlapping segments.
+
+    Parameters
+    ----------
+    number_of_samples
+        Number of samples of the recording.
+    segment_length
+        Number of samples per segment.
+    overlap
+        Number of samples shared by consecutive segments, smaller than segment_length.
+
+    Returns
+    -------
+    boundaries
+        First and last (exclusive) sample of every segment.
+    """
+    if not 0 <= overlap < segment_length:
+        raise ValueError(f'The overlap of {overlap} samples has to be non-negative and shorter than the segments of '
+                         f'{segment_length} samples.')
+    starts = arange(0, max(number_of_samples - overlap, 1), segment_length - overlap)
+    return [(int(start), min(int(start) + segment_length, number_of_samples)) for start in starts]
+
+
+def match_permutation(previous_source_images: ndarray, source_images: ndarray) -> ndarray:
+    """
+    Finds the source order that maximizes the normalized correlation between two separations of the same samples.
+    Silent sources have zero correlation with all others.
+
+    Parameters
+    ----------
+    previous_source_images
+        Reference source images. Shape: [source x channel x sample]
+    source_images
+        Source images to be reordered. Shape: [source x channel x sample]
+
+    Returns
+    -------
+    permutation
+        Source indices, such that source_images[permutation] matches previous_source_images. Shape: [source]
+    """
+    correlation = abs(einsum('jlt, klt -> jk', previous_source_images, source_images.conj()))
+    norms = sqrt(einsum('jlt, jlt -> j', previous_source_images, previous_source_images.conj()).real)[:, None] * \
+        sqrt(einsum('klt, klt -> k', source_images, source_images.conj()).real)[None]
+    return linear_sum_assignment(correlation / maximum(norms, finfo(float).tiny), maximize=True)[1]
+
+
+def separate_in_segments(audio: ndarray, separate: Callable[[ndarray], ndarray], segment_length: int, overlap: int,
+                         number_of_workers: int = 1, match_permutations: bool = True) -> ndarray:
+    """
+    Separates overlapping segments of a recording independently and overlap-adds the source images with linear
+    cross-fades.
+
+    Parameters
+    ----------
+    audio
+        Multichannel audio file. Shape: [channel x sample]
+    separate
+        Function separating a segment into source images, e.g. STFT analysis, model fit, mimo_mwf and STFT synthesis.
+        Images longer than the segment are truncated and shorter ones are zero-padded. With more than one worker it
+        has to be picklable, i.e., a module level function. Shape: [channel x sample] -> [source x channel x sample]
+    segment_length
+        Number of samples per segment.
+    overlap
+        Number of samples shared by consecutive segments, smaller than segment_length. Without overlap the sources
+        can not be matched between segments.
+    number_of_workers
+        Number of processes separating the segments in parallel.
+    match_permutations
+        If True, the sources of every segment are reordered to match the previous segment within the overlap. Models
+        with localization priors keep the order of the given directions of arrival, hence it may be disabled for them.
+
+    Returns
+    -------
+    source_images
+        Separated source images. Shape: [source x channel x sample]
+    """
+    boundaries = segment_boundaries(audio.shape[-1], segment_length, overlap)
+    segments = [audio[:, start:stop] for start, stop in boundaries]
+    if number_of_workers == 1:
+        segment_images = list(map(separate, segments))
+    else:
+        with ProcessPoolExecutor(number_of_workers) as executor:
+            segment_images = list(executor.map(separate, segments))
+
+    source_images = None
+    previous_stop = 0
+    for (start, stop), images in zip(boundaries, segment_images):
+        images = pad(images[..., :stop - start], ((0, 0), (0, 0), (0, max(stop - start - images.shape[-1], 0))))
+        if source_images is None:
+            source_images = zeros(images.shape[:2] + audio.shape[-1:], dtype=images.dtype)
+        elif match_permutations and previous_stop > start:
+            images = images[match_permutation(source_images[..., start:previous_stop],
+                                              images[..., :previous_stop - start])]
+        fade = ones(stop - start)
+        fade[:previous_stop - start] = linspace(0, 1, previous_stop - start + 2)[1:-1]
+        source_images[..., start:previous_stop] *= 1 - fade[:previous_stop - start]
+        source_images[..., start:stop] += fade * images
+        previous_stop = stop
+    return source_images
@@ -1,4 +1,6 @@
-from numpy import floor, imag, ndarray, real, sqrt, zeros
+from typing import Dict
+
+from numpy import asarray, floor, imag, ndarray, real, searchsorted, sqrt, zeros
 from scipy.special import sph_harm
 
 
@@ -35,6 +37,28 @@ def order_to_number_of_channels(order: int) -> int:
     return int((order + 1) ** 2)
 
 
+def frequency_to_order(frequencies: ndarray, order_map: Dict[float, int]) -> ndarray:
+    """
+    Spherical Harmonic order limit of each frequency bin.
+
+    Parameters
+    ----------
+    frequencies
+        Discrete frequencies in Hertz. Shape: [frequency]
+    order_map
+        Maps lower edge frequencies of the bands in Hertz to the orders used from there on, e.g.
+        {0: 1, 800: 2, 2000: 3}. Frequencies below the lowest edge use the lowest band.
+
+    Returns
+    -------
+    order_limits
+        Spherical Harmonic order per frequency bin. Shape: [frequency]
+    """
+    edges = sorted(order_map)
+    band_indices = searchsorted(edges, frequencies, side='right') - 1
+    return asarray([order_map[edges[max(band_index, 0)]] for band_index in band_indices])
+
+
 def matrix(angles, order) -> ndarray:
     """
     Spherical Harmonic coefficients in the N3D-ACN convention.
@@ -1,10 +1,16 @@
 from typing import Tuple
 
-from numpy import asarray, einsum, ndarray
+from numpy import (add, append, arange, asarray, conjugate, diff, einsum, empty, iscomplexobj, ix_, ndarray, repeat,
+                   sqrt, trace, tri, where)
 from scipy.signal import istft as scipy_istft
 from scipy.signal import stft as scipy_stft
 
+from asintf.cache import cached
+from asintf.profiling import observed
 
+
+@observed
+@cached
 def analysis(audio: ndarray, sampling_frequency: int, window: str, nperseg: int,
              noverlap: int) -> Tuple[ndarray, ndarray, ndarray]:
     """
@@ -44,6 +50,7 @@ def analysis(audio: ndarray, sampling_frequency: int, window: str, nperseg: int,
     return f, t, asarray(X)
 
 
+@observed
 def synthesis(stft: ndarray, sampling_frequency: int, window: str, nperseg: int, noverlap: int):
     """
     Inverse Short Time Fourier Transform.
@@ -79,6 +86,8 @@ def synthesis(stft: ndarray, sampling_frequency: int, window: str, nperseg: int,
     return t, asarray(x)
 
 
+@observed
+@cached
 def magnitude_compression(stft: ndarray, compression_factor: int = 2) -> ndarray:
     """
     Magnitude compression of Short Time Fourier Transform coefficients.
@@ -98,7 +107,9 @@ def magnitude_compression(stft: ndarray, compression_factor: int = 2) -> ndarray
     return abs(stft) ** (1 / compression_factor - 1) * stft
 
 
-def estimate_covariance_matrices(stft: ndarray) -> ndarray:
+@observed
+@cached
+def estimate_covariance_matrices(stft: ndarray, packed: bool = False) -> ndarray:
     """
     Computes spatial covariance matrices from stacked Short Time Fourier Transform coefficients.
 
@@ -106,10 +117,235 @@ def estimate_covariance_matrices(stft: ndarray) -> ndarray:
     ----------
     stft
         Short Time Fourier Transform coefficients. Shape: [channel x ...]
+    packed
+        If True, only the upper triangles of the Hermitian matrices are computed and returned in the packed layout of
+        pack_covariance_matrices, which the models consume directly.
 
     Returns
     -------
     covariances
-        Covariance matrices. Shape: [... x channel x channel]
+        Covariance matrices. Shape: [... x channel x channel] or [... x packed entry] if packed
     """
+    if packed:
+        rows, columns = packed_indices(stft.shape[0])
+        return einsum('p..., p... -> ...p', stft[rows], stft[columns].conj())
     return einsum('a..., b... -> ...ab', stft, stft.conj())
+
+
+def number_of_channels_to_packed_size(number_of_channels: int) -> int:
+    """
+    Calculate number of entries of a packed matrix from number of channels.
+
+    Parameters
+    ----------
+    number_of_channels
+        Number of channels.
+
+    Returns
+    -------
+    packed_size
+        Number of entries of the upper triangle.
+    """
+    return number_of_channels * (number_of_channels + 1) // 2
+
+
+def packed_size_to_number_of_channels(packed_size: int) -> int:
+    """
+    Calculate number of channels from number of entries of a packed matrix.
+
+    Parameters
+    ----------
+    packed_size
+        Number of entries of the upper triangle.
+
+    Returns
+    -------
+    number_of_channels
+        Number of channels.
+    """
+    return int(round((sqrt(8 * packed_size + 1) - 1) / 2))
+
+
+def packed_indices(number_of_channels: int) -> Tuple[ndarray, ndarray]:
+    """
+    Row and column indices of the packed entries. The upper triangle is stored column by column, hence the first
+    number_of_channels_to_packed_size(n) entries are the packed leading n x n sub-matrix, e.g. the channels up to a
+    lower Spherical Harmonic order.
+
+    Parameters
+    ----------
+    number_of_channels
+        Number of channels.
+
+    Returns
+    -------
+    rows
+        Row indices. Shape: [packed entry]
+    columns
+        Column indices. Shape: [packed entry]
+    """
+    columns = repeat(arange(number_of_channels), arange(1, number_of_channels + 1))
+    return arange(len(columns)) - columns * (columns + 1) // 2, columns
+
+
+def packed_trace_weights(number_of_channels: int) -> ndarray:
+    """
+    Weights of the packed entries, such that tr(A B) = sum(weights * A_packed * B_packed).real for a Hermitian A and a
+    real symmetric B, i.e., 1 on the diagonal and 2 off the diagonal.
+
+    Parameters
+    ----------
+    number_of_channels
+        Number of channels.
+
+    Returns
+    -------
+    weights
+        Trace weights. Shape: [packed entry]
+    """
+    rows, columns = packed_indices(number_of_channels)
+    return where(rows == columns, 1., 2.)
+
+
+def pack_covariance_matrices(covariance_matrices: ndarray) -> ndarray:
+    """
+    Stores the upper triangles of Hermitian or symmetric matrices only.
+
+    Parameters
+    ----------
+    covariance_matrices
+        Covariance matrices. Shape: [... x channel x channel]
+
+    Returns
+    -------
+    covariances
+        Packed covariance matrices. Shape: [... x packed entry]
+    """
+    rows, columns = packed_indices(covariance_matrices.shape[-1])
+    return covariance_matrices[..., rows, columns]
+
+
+def unpack_covariance_matrices(packed_covariance_matrices: ndarray) -> ndarray:
+    """
+    Restores the full Hermitian or symmetric matrices from their packed upper triangles.
+
+    Parameters
+    ----------
+    packed_covariance_matrices
+        Packed covariance matrices. Shape: [... x packed entry]
+
+    Returns
+    -------
+    covariances
+        Covariance matrices. Shape: [... x channel x channel]
+    """
+    number_of_channels = packed_size_to_number_of_channels(packed_covariance_matrices.shape[-1])
+    rows, columns = packed_indices(number_of_channels)
+    entries = empty((number_of_channels, number_of_channels), dtype=int)
+    entries[rows, columns] = entries[columns, rows] = arange(len(rows))
+    covariance_matrices = packed_covariance_matrices.take(entries, axis=-1)
+    if iscomplexobj(covariance_matrices):
+        conjugate(covariance_matrices, out=covariance_matrices, where=tri(number_of_channels, k=-1, dtype=bool))
+    return covariance_matrices
+
+
+def pool(values: ndarray, factor: int, axis: int) -> ndarray:
+    """
+    Averages values over blocks of adjacent elements. The last block may be shorter.
+
+    Parameters
+    ----------
+    values
+        Values to be pooled. Shape: [...]
+    factor
+        Number of elements per block.
+    axis
+        Axis along which the values are pooled.
+
+    Returns
+    -------
+    values
+        Pooled values. Shape: [...]
+    """
+    starts = arange(0, values.shape[axis], factor)
+    block_sizes = diff(append(starts, values.shape[axis]))
+    shape = [1] * values.ndim
+    shape[axis] = -1
+    return add.reduceat(values, starts, axis=axis) / block_sizes.reshape(shape)
+
+
+@observed
+def pool_covariance_matrices(covariance_matrices: ndarray, frequency_factor: int, frame_factor: int) -> ndarray:
+    """
+    Averages covariance matrices over blocks of adjacent frequency bins and frames.
+
+    Parameters
+    ----------
+    covariance_matrices
+        Covariance matrices. Shape: [frequency x frame x channel x channel] or [frequency x frame x packed entry]
+    frequency_factor
+        Number of frequency bins per block.
+    frame_factor
+        Number of frames per block.
+
+    Returns
+    -------
+    covariances
+        Pooled covariance matrices. Shape: [pooled frequency x pooled frame x ...]
+    """
+    return pool(pool(covariance_matrices, frequency_factor, 0), frame_factor, 1)
+
+
+@observed
+def energy_mask(covariance_matrices: ndarray, threshold: float = -60.) -> Tuple[ndarray, ndarray]:
+    """
+    Finds the frequency bins and frames whose energy is above a threshold relative to the most energetic one. The
+    models can be run on the compacted covariance matrices covariance_matrices[ix_(active_bins, active_frames)].
+
+    Parameters
+    ----------
+    covariance_matrices
+        Covariance matrices. Shape: [frequency x frame x channel x channel] or [frequency x frame x packed entry]
+    threshold
+        Energy threshold in decibels relative to the maximum.
+
+    Returns
+    -------
+    active_bins
+        Mask of the frequency bins above the threshold. Shape: [frequency]
+    active_frames
+        Mask of the frames above the threshold. Shape: [frame]
+    """
+    if covariance_matrices.ndim == 3:
+        rows, columns = packed_indices(packed_size_to_number_of_channels(covariance_matrices.shape[-1]))
+        energy = covariance_matrices[..., rows == columns].real.sum(axis=-1)
+    else:
+        energy = trace(covariance_matrices, axis1=-2, axis2=-1).real
+    bin_energy, frame_energy = energy.sum(axis=1), energy.sum(axis=0)
+    return (bin_energy >= 10 ** (threshold / 10) * bin_energy.max(),
+            frame_energy >= 10 ** (threshold / 10) * frame_energy.max())
+
+
+def fill_skipped(values: ndarray, active_bins: ndarray, active_frames: ndarray, fill_values: ndarray) -> ndarray:
+    """
+    Places values computed on the frequency bins and frames selected by energy_mask back into the full grid.
+
+    Parameters
+    ----------
+    values
+        Values of the active bins and frames, e.g. spectrograms. Shape: [... x active frequency x active frame]
+    active_bins
+        Mask of the active frequency bins. Shape: [frequency]
+    active_frames
+        Mask of the active frames. Shape: [frame]
+    fill_values
+        Values of the full grid used for the skipped bins and frames, e.g. zeros. Shape: [... x frequency x frame]
+
+    Returns
+    -------
+    values
+        Values of the full grid. Shape: [... x frequency x frame]
+    """
+    filled = fill_values.astype(values.dtype)
+    filled[(..., *ix_(active_bins, active_frames))] = values
+    return filled
@@ -0,0 +1,87 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from time import perf_counter
+from typing import Dict, List, Sequence
+
+from threadpoolctl import threadpool_limits
+
+from asintf.NTFBase import NTFBase
+
+_models = None
+_blas_limits = None
+
+
+def fit_configuration(model: NTFBase, configuration: Dict[str, object], number_of_iterations: int) -> Dict[str, object]:
+    """
+    Fits a copy of the model with the given hyperparameters.
+
+    Parameters
+    ----------
+    model
+        Model, which is left unchanged. The copy shares its covariance matrices, direction grid and einsum paths.
+    configuration
+        Hyperparameters, each set with the set_<name> method of the model, e.g. {'degrees_of_freedom': 5.} calls
+        set_degrees_of_freedom(5.).
+    number_of_iterations
+        Number of iterations.
+
+    Returns
+    -------
+    result
+        Configuration extended with the model class name, the final cost function, the wall time in seconds of setting
+        the hyperparameters and fitting, and the factors Q, W, H and Z.
+    """
+    start = perf_counter()
+    model = model.copy()
+    for name, value in configuration.items():
+        getattr(model, 'set_' + name)(value)
+    model.fit(model.number_of_iterations + number_of_iterations)
+    return dict(configuration, model=type(model).__name__, cost=model.cost_function, time=perf_counter() - start,
+                factors=model.factors)
+
+
+def _initialize_worker(models: Sequence[NTFBase]) -> None:
+    global _models, _blas_limits
+    _models = models
+    _blas_limits = threadpool_limits(limits=1, user_api='blas')
+
+
+def _fit_worker_configuration(index: int, configuration: Dict[str, object],
+                              number_of_iterations: int) -> Dict[str, object]:
+    return fit_configuration(_models[index], configuration, number_of_iterations)
+
+
+def sweep(models: Sequence[NTFBase], configurations: Sequence[Dict[str, object]], number_of_iterations: int,
+          number_of_workers: int = 1) -> List[Dict[str, object]]:
+    """
+    Fits every model with every configuration of hyperparameters, e.g. to tune the prior hyperparameters of the
+    *_WLP and *_IWLP models constructed once from the same covariance matrices. Every fit starts from a copy of the
+    given model, which shares the covariance matrices, the Spherical Harmonic outer products and the einsum paths, and
+    only the cached properties depending on the changed hyperparameters are recomputed.
+
+    Parameters
+    ----------
+    models
+        Constructed models, possibly of different classes.
+    configurations
+        Hyperparameters, each set with the set_<name> method of the model, e.g. {'degrees_of_freedom': 5.,
+        'direct_to_reverb_ratio': 2.} or {'components_per_source': 8}. Configurations with hyperparameters a model does
+        not have, e.g. standard_deviation for the IS models, are skipped for that model.
+    number_of_iterations
+        Number of iterations per fit.
+    number_of_workers
+        Number of processes fitting the configurations in parallel. The models are sent to every process once, and
+        every process limits BLAS to a single thread.
+
+    Returns
+    -------
+    results
+        One result of fit_configuration per fitted model and configuration, in the order of the models and the
+        configurations.
+    """
+    tasks = [(index, configuration) for index, model in enumerate(models) for configuration in configurations
+             if all(hasattr(model, 'set_' + name) for name in configuration)]
+    if number_of_workers == 1 or not tasks:
+        return [fit_configuration(models[index], configuration, number_of_iterations) for index, configuration in tasks]
+    with ProcessPoolExecutor(number_of_workers, initializer=_initialize_worker, initargs=(models,)) as executor:
+        return list(executor.map(_fit_worker_configuration, *zip(*tasks), repeat(number_of_iterations)))
@@ -0,0 +1,168 @@
+"""
+Micro-benchmarks of the models and the processing stages on synthetic Ambisonic mixtures.
+
+Every combination of the swept parameters is timed for model construction, a single iteration, the blind
+hyperparameter estimation, mimo_mwf and STFT analysis/synthesis. The time is the minimum over the repetitions, the
+peak memory is traced with tracemalloc in a separate run. The results are written as JSON together with the commit
+they were measured on and can be compared with compare.py.
+
+Usage:
+    python benchmarks/benchmark.py --orders 1 2 3 4 --output results.json
+    python benchmarks/benchmark.py --models EU IS --threads 1 4 --output threads.json
+    python benchmarks/compare.py baseline.json results.json
+"""
+import platform
+import tracemalloc
+from argparse import ArgumentParser
+from itertools import product
+from json import dump
+from subprocess import run
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+
+import numpy
+from numpy import ndarray
+from numpy.linalg import LinAlgError
+from numpy.random import default_rng, Generator
+
+from asintf.EU import EU
+from asintf.EU_BIWLP import EU_BIWLP
+from asintf.EU_BWLP import EU_BWLP
+from asintf.EU_IWLP import EU_IWLP
+from asintf.EU_WLP import EU_WLP
+from asintf.IS import IS
+from asintf.IS_BIWLP import IS_BIWLP
+from asintf.IS_BWLP import IS_BWLP
+from asintf.IS_IWLP import IS_IWLP
+from asintf.IS_JD import IS_JD
+from asintf.IS_JD_IWLP import IS_JD_IWLP
+from asintf.IS_JD_WLP import IS_JD_WLP
+from asintf.IS_WLP import IS_WLP
+from asintf.NTFBase import NTFBase
+from asintf.PriorBase import PriorBase
+from asintf.geometry import cartesian_to_spherical
+from asintf.reconstruction import mimo_mwf
+from asintf.spherical_harmonics import matrix
+from asintf.stft import analysis, estimate_covariance_matrices, synthesis
+
+STANDARD_DEVIATION = 3.
+DIRECT_TO_REVERB_RATIO = 3.
+DEGREES_OF_FREEDOM = 10.
+
+MODELS = {
+    'EU': lambda R, X, doa, J, K, D, g: EU(R, J, K, D, g),
+    'IS': lambda R, X, doa, J, K, D, g: IS(R, J, K, D, g),
+    'IS_JD': lambda R, X, doa, J, K, D, g: IS_JD(R, J, K, D, g),
+    'EU_WLP': lambda R, X, doa, J, K, D, g: EU_WLP(
+        R, J, K, D, STANDARD_DEVIATION, doa, DIRECT_TO_REVERB_RATIO, DEGREES_OF_FREEDOM, g),
+    'EU_IWLP': lambda R, X, doa, J, K, D, g: EU_IWLP(
+        R, J, K, D, STANDARD_DEVIATION, doa, DIRECT_TO_REVERB_RATIO, DEGREES_OF_FREEDOM, g),
+    'IS_WLP': lambda R, X, doa, J, K, D, g: IS_WLP(R, J, K, D, doa, DIRECT_TO_REVERB_RATIO, DEGREES_OF_FREEDOM, g),
+    'IS_IWLP': lambda R, X, doa, J, K, D, g: IS_IWLP(R, J, K, D, doa, DIRECT_TO_REVERB_RATIO, DEGREES_OF_FREEDOM, g),
+    'IS_JD_WLP': lambda R, X, doa, J, K, D, g: IS_JD_WLP(
+        R, J, K, D, doa, DIRECT_TO_REVERB_RATIO, DEGREES_OF_FREEDOM, g),
+    'IS_JD_IWLP': lambda R, X, doa, J, K, D, g: IS_JD_IWLP(
+        R, J, K, D, doa, DIRECT_TO_REVERB_RATIO, DEGREES_OF_FREEDOM, g),
+    'EU_BWLP': lambda R, X, doa, J, K, D, g: EU_BWLP(X, J, K, D, STANDARD_DEVIATION, doa, g),
+    'EU_BIWLP': lambda R, X, doa, J, K, D, g: EU_BIWLP(X, J, K, D, STANDARD_DEVIATION, doa, g),
+    'IS_BWLP': lambda R, X, doa, J, K, D, g: IS_BWLP(X, J, K, D, doa, g),
+    'IS_BIWLP': lambda R, X, doa, J, K, D, g: IS_BIWLP(X, J, K, D, doa, g),
+}
+
+
+def synthetic_mixture(order: int, number_of_sources: int, number_of_samples: int,
+                      random_generator: Generator) -> Tuple[ndarray, ndarray]:
+    """
+    Plane waves of white noise sources from random directions with a weak diffuse component.
+
+    Returns
+    -------
+    audio
+        Multichannel audio file. Shape: [channel x sample]
+    directions_of_arrival_cartesian
+        Cartesian coordinates of the sources. Shape: [source x 3 (x, y, z)]
+    """
+    doa = random_generator.standard_normal((number_of_sources, 3))
+    doa /= numpy.linalg.norm(doa, axis=1)[:, None]
+    steering_vectors = matrix(cartesian_to_spherical(doa)[:, 1:], order)
+    audio = steering_vectors.T @ random_generator.standard_normal((number_of_sources, number_of_samples))
+    audio += 0.1 * random_generator.standard_normal(audio.shape)
+    return audio, doa
+
+
+def measure(function: Callable[[], object], repetitions: int) -> Dict[str, object]:
+    times = []
+    for _ in range(repetitions):
+        start = perf_counter()
+        try:
+            function()
+        except (ArithmeticError, ValueError, LinAlgError) as error:
+            return {'time': None, 'peak_bytes': None, 'error': repr(error)}
+        times.append(perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'time': min(times), 'peak_bytes': peak}
+
+
+def benchmark(models: List[str], order: int, J: int, K: int, D: int, F: int, T: int, threads: int,
+              repetitions: int) -> List[Dict[str, object]]:
+    nperseg = 2 * (F - 1)
+    audio, doa = synthetic_mixture(order, J, nperseg // 2 * (T - 1), default_rng(0))
+    _, _, X = analysis(audio, 16000, 'hann', nperseg, nperseg // 2)
+    R = estimate_covariance_matrices(X)
+    parameters = {'order': order, 'J': J, 'K': K, 'D': D, 'F': X.shape[1], 'T': X.shape[2], 'threads': threads}
+    results = [
+        dict(parameters, model=None, operation='stft.analysis',
+             **measure(lambda: analysis(audio, 16000, 'hann', nperseg, nperseg // 2), repetitions)),
+        dict(parameters, model=None, operation='stft.synthesis',
+             **measure(lambda: synthesis(X, 16000, 'hann', nperseg, nperseg // 2), repetitions)),
+        dict(parameters, model=None, operation='direct_to_reverb_ratio',
+             **measure(lambda: PriorBase._estimate_direct_to_reverb_ratio(X, doa), repetitions)),
+        dict(parameters, model=None, operation='degrees_of_freedom',
+             **measure(lambda: PriorBase._estimate_degrees_of_freedom(X, DIRECT_TO_REVERB_RATIO, doa), repetitions)),
+    ]
+    for name in models:
+        def construct() -> NTFBase:
+            return MODELS[name](R, X, doa, J, K, D, default_rng(0))
+
+        model = construct()
+        model.set_number_of_threads(threads)
+        results.append(dict(parameters, model=name, operation='construction', **measure(construct, repetitions)))
+        results.append(dict(parameters, model=name, operation='iteration', **measure(model.iteration, repetitions)))
+        results.append(dict(parameters, model=name, operation='mimo_mwf',
+                            **measure(lambda: mimo_mwf(X, model.covariance_matrices), repetitions)))
+    return results
+
+
+def commit() -> str:
+    return run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--models', nargs='+', default=list(MODELS), choices=list(MODELS))
+    parser.add_argument('--orders', nargs='+', type=int, default=[1, 2])
+    parser.add_argument('--sources', nargs='+', type=int, default=[3])
+    parser.add_argument('--components', nargs='+', type=int, default=[5])
+    parser.add_argument('--directions', nargs='+', type=int, default=[162])
+    parser.add_argument('--bins', nargs='+', type=int, default=[257])
+    parser.add_argument('--frames', nargs='+', type=int, default=[64])
+    parser.add_argument('--threads', nargs='+', type=int, default=[1])
+    parser.add_argument('--repetitions', type=int, default=3)
+    parser.add_argument('--output', default='benchmark.json')
+    arguments = parser.parse_args()
+
+    results = []
+    for order, J, K, D, F, T, threads in product(arguments.orders, arguments.sources, arguments.components,
+                                                 arguments.directions, arguments.bins, arguments.frames,
+                                                 arguments.threads):
+        for result in benchmark(arguments.models, order, J, K, D, F, T, threads, arguments.repetitions):
+            results.append(result)
+            measurement = result.get('error') or f"{result['time']:9.4f}s {result['peak_bytes'] / 1e6:9.1f}MB"
+            print(f"{result['model'] or '':9s} {result['operation']:24s} order={order} J={J} K={K} D={D} "
+                  f"F={result['F']} T={result['T']} threads={threads} {measurement}")
+    with open(arguments.output, 'w') as file:
+        dump({'commit': commit(), 'numpy': numpy.__version__, 'machine': platform.platform(),
+              'processor': platform.processor(), 'results': results}, file, indent=1)
@@ -0,0 +1,36 @@
+"""
+Compares two benchmark result files written by benchmark.py.
+
+Usage:
+    python benchmarks/compare.py baseline.json results.json
+"""
+from argparse import ArgumentParser
+from json import load
+
+KEYS = ('model', 'operation', 'order', 'J', 'K', 'D', 'F', 'T', 'threads')
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('baseline')
+    parser.add_argument('results')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative change in time marked as a regression or an improvement')
+    arguments = parser.parse_args()
+
+    with open(arguments.baseline) as file:
+        baseline = load(file)
+    with open(arguments.results) as file:
+        results = load(file)
+    print(f"{baseline['commit']} -> {results['commit']}")
+    # results written before the threads were swept ran single-threaded
+    reference = {tuple(result.get(key, 1) for key in KEYS): result for result in baseline['results']}
+    for result in results['results']:
+        key = tuple(result.get(key, 1) for key in KEYS)
+        if key not in reference or result['time'] is None or reference[key]['time'] is None:
+            continue
+        ratio = result['time'] / reference[key]['time']
+        memory_ratio = result['peak_bytes'] / max(reference[key]['peak_bytes'], 1)
+        mark = 'slower' if ratio > 1 + arguments.threshold else 'faster' if ratio < 1 - arguments.threshold else ''
+        print(f"{result['model'] or '':9s} {result['operation']:24s} order={result['order']} J={result['J']} "
+              f"K={result['K']} D={result['D']} F={result['F']} T={result['T']} threads={result.get('threads', 1)} "
+              f"time x{ratio:6.2f} memory x{memory_ratio:6.2f} {mark}")
@@ -0,0 +1,64 @@
+from os import utime
+from os.path import join
+
+from numpy import arange, memmap
+from numpy.random import default_rng
+from numpy.testing import assert_array_equal
+
+from asintf.PriorBase import PriorBase
+from asintf.cache import Cache, key
+from asintf.stft import analysis, estimate_covariance_matrices
+
+
+def define(source: str):
+    namespace = {}
+    exec(source, namespace)
+    return namespace['scale']
+
+
+def test_key_covers_constants_and_names():
+    values = arange(3.)
+    doubled = key(define('def scale(values):\n    return 2 * values'), values)
+    assert doubled != key(define('def scale(values):\n    return 3 * values'), values)
+    assert doubled != key(define('def scale(values):\n    return 2 * abs(values)'), values)
+    assert doubled != key(define('def scale(values):\n    return [2 * value for value in values]'), values)
+    assert doubled == key(define('\n\ndef scale(values):\n    return 2 * values'), values)
+
+
+def test_hit_after_miss_returns_read_only_memory_maps(tmp_path):
+    stft = default_rng(0).standard_normal((4, 5, 6)) + 0j
+    with Cache(str(tmp_path)) as cache:
+        computed = estimate_covariance_matrices(stft)
+        loaded = estimate_covariance_matrices(stft)
+    assert (cache.misses, cache.hits) == (1, 1)
+    assert isinstance(loaded, memmap) and not loaded.flags.writeable
+    assert_array_equal(loaded, computed)
+
+
+def test_tuples_and_scalars_are_restored(tmp_path):
+    g = default_rng(0)
+    audio = g.standard_normal((4, 2000))
+    doa = g.standard_normal((2, 3))
+    with Cache(str(tmp_path), memory_map=False) as cache:
+        computed = analysis(audio, 16000, 'hann', 256, 128)
+        loaded = analysis(audio, 16000, 'hann', 256, 128)
+        ratio = PriorBase._estimate_direct_to_reverb_ratio(computed[2], doa)
+        loaded_ratio = PriorBase._estimate_direct_to_reverb_ratio(computed[2], doa)
+    assert (cache.misses, cache.hits) == (2, 2)
+    assert isinstance(loaded, tuple) and len(loaded) == len(computed)
+    for loaded_value, value in zip(loaded, computed):
+        assert_array_equal(loaded_value, value)
+    assert isinstance(loaded_ratio, float) and loaded_ratio == ratio
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    values = (arange(1000.),)
+    cache = Cache(str(tmp_path), maximum_bytes=2 ** 14)
+    for age, entry in enumerate('ab'):
+        cache.store(entry, values)
+        utime(join(str(tmp_path), entry), (age + 1, age + 1))
+    assert cache.load('a') is not None
+    cache.store('c', values)
+    assert cache.load('b') is None
+    assert cache.load('a') is not None and cache.load('c') is not None
+    assert cache.size <= 2 ** 14
@@ -0,0 +1,501 @@
+"""
+Regression tests of the per-iteration cost of the models against a dense reference implementation of the original
+update rules, i.e., full channel x channel matrices, hatR formed explicitly and no frequency blocks.
+"""
+from pickle import dumps, loads
+
+import pytest
+from numpy import arange, einsum, isfinite, log, ndarray, pi, trace, zeros
+from numpy.linalg import LinAlgError, det, norm, pinv
+from numpy.random import default_rng
+from numpy.testing import assert_allclose, assert_array_equal
+
+from asintf.EU import EU
+from asintf.EU_BIWLP import EU_BIWLP
+from asintf.EU_BWLP import EU_BWLP
+from asintf.EU_IWLP import EU_IWLP
+from asintf.EU_WLP import EU_WLP
+from asintf.IS import IS
+from asintf.IS_BIWLP import IS_BIWLP
+from asintf.IS_BWLP import IS_BWLP
+from asintf.IS_IWLP import IS_IWLP
+from asintf.IS_JD import IS_JD
+from asintf.IS_JD_IWLP import IS_JD_IWLP
+from asintf.IS_JD_WLP import IS_JD_WLP
+from asintf.IS_WLP import IS_WLP
+from asintf.geometry import cartesian_to_spherical
+from asintf.spherical_harmonics import matrix
+from asintf.stft import estimate_covariance_matrices, packed_indices, unpack_covariance_matrices
+
+ORDER = 2
+NUMBER_OF_SOURCES = 2
+COMPONENTS_PER_SOURCE = 3
+NUMBER_OF_DIRECTIONS = 12
+NUMBER_OF_ITERATIONS = 5
+STANDARD_DEVIATION = pi ** -.5
+DIRECT_TO_REVERB_RATIO = 3.
+DEGREES_OF_FREEDOM = 10.
+
+MODELS = {
+    'EU': lambda R, X, doa, g: EU(R, NUMBER_OF_SOURCES, COMPONENTS_PER_SOURCE, NUMBER_OF_DIRECTIONS, g),
+    'IS': lambda R, X, doa, g: IS(R, NUMBER_OF_SOURCES, COMPONENTS_PER_SOURCE, NUMBER_OF_DIRECTIONS, g),
+    'EU_WLP': lambda R, X, doa, g: EU_WLP(R, NUMBER_OF_SOURCES, COMPONENTS_PER_SOURCE, NUMBER_OF_DIRECTIONS,
+                                          STANDARD_DEVIATION, doa, DIRECT_TO_REVERB_RATIO, DEGREES_OF_FREEDOM, g),
+    'EU_IWLP': lambda R, X, doa, g: EU_IWLP(R, NUMBER_OF_SOURCES, COMPONENTS_PER_SOURCE, NUMBER_OF_DIRECTIONS,
+                                            STANDARD_DEVIATION, doa, DIRECT_TO_REVERB_RATIO, DEGREES_OF_FREEDOM, g),
+    'EU_BWLP': lambda R, X, doa, g: EU_BWLP(X, NUMBER_OF_SOURCES, COMPONENTS_PER_SOURCE, NUMBER_OF_DIRECTIONS,
+                                            STANDARD_DEVIATION, doa, g),
+    'EU_BIWLP': lambda R, X, doa, g: EU_BIWLP(X, NUMBER_OF_SOURCES, COMPONENTS_PER_SOURCE, NUMBER_OF_DIRECTIONS,
+                                              STANDARD_DEVIATION, doa, g),
+    'IS_WLP': lambda R, X, doa, g: IS_WLP(R, NUMBER_OF_SOURCES, COMPONENTS_PER_SOURCE, NUMBER_OF_DIRECTIONS, doa,
+                                          DIRECT_TO_REVERB_RATIO, DEGREES_OF_FREEDOM, g),
+    'IS_IWLP': lambda R, X, doa, g: IS_IWLP(R, NUMBER_OF_SOURCES, COMPONENTS_PER_SOURCE, NUMBER_OF_DIRECTIONS, doa,
+                                            DIRECT_TO_REVERB_RATIO, DEGREES_OF_FREEDOM, g),
+    'IS_BWLP': lambda R, X, doa, g: IS_BWLP(X, NUMBER_OF_SOURCES, COMPONENTS_PER_SOURCE, NUMBER_OF_DIRECTIONS, doa, g),
+    'IS_BIWLP': lambda R, X, doa, g: IS_BIWLP(X, NUMBER_OF_SOURCES, COMPONENTS_PER_SOURCE, NUMBER_OF_DIRECTIONS, doa,
+                                              g),
+}
+JD_MODELS = {
+    'IS_JD': lambda R, X, doa, g: IS_JD(R, NUMBER_OF_SOURCES, COMPONENTS_PER_SOURCE, NUMBER_OF_DIRECTIONS, g),
+    'IS_JD_WLP': lambda R, X, doa, g: IS_JD_WLP(R, NUMBER_OF_SOURCES, COMPONENTS_PER_SOURCE, NUMBER_OF_DIRECTIONS, doa,
+                                                DIRECT_TO_REVERB_RATIO, DEGREES_OF_FREEDOM, g),
+    'IS_JD_IWLP': lambda R, X, doa, g: IS_JD_IWLP(R, NUMBER_OF_SOURCES, COMPONENTS_PER_SOURCE, NUMBER_OF_DIRECTIONS,
+                                                  doa, DIRECT_TO_REVERB_RATIO, DEGREES_OF_FREEDOM, g),
+}
+
+
+@pytest.fixture(scope='module')
+def mixture():
+    """
+    Plane waves from random directions with random spectral envelopes and a weak diffuse component.
+
+    Returns
+    -------
+    stft
+        Multichannel Short Time Fourier Transform coefficients. Shape: [channel x frequency x frame]
+    directions_of_arrival_cartesian
+        Cartesian coordinates of the sources. Shape: [source x 3 (x, y, z)]
+    """
+    g = default_rng(0)
+    doa = g.standard_normal((NUMBER_OF_SOURCES, 3))
+    doa /= norm(doa, axis=1)[:, None]
+    steering_vectors = matrix(cartesian_to_spherical(doa)[:, 1:], ORDER)
+    envelopes = g.random((NUMBER_OF_SOURCES, 16, 1)) * g.random((NUMBER_OF_SOURCES, 1, 20))
+    signals = envelopes * (g.standard_normal(envelopes.shape) + 1j * g.standard_normal(envelopes.shape))
+    noise = g.standard_normal((len(steering_vectors[0]),) + envelopes.shape[1:]) + \
+        1j * g.standard_normal((len(steering_vectors[0]),) + envelopes.shape[1:])
+    return einsum('jl, jft -> lft', steering_vectors, signals) + .05 * noise, doa
+
+
+def build(name: str, mixture, packed: bool = True):
+    stft, doa = mixture
+    return dict(MODELS, **JD_MODELS)[name](estimate_covariance_matrices(stft, packed=packed), stft, doa,
+                                           default_rng(1))
+
+
+def dense_covariance_matrices(model) -> ndarray:
+    rows, columns = packed_indices(model._L)
+    R = model._R.astype(complex)
+    R[..., rows != columns] += 1j * model._R_imag
+    return unpack_covariance_matrices(R)
+
+
+class Reference:
+    """
+    Dense implementation of the original multiplicative updates and cost functions, started from the factors of a
+    model. Channels above the order limit of a bin are zeroed in the matrices the traces are taken against.
+    """
+
+    def __init__(self, model):
+        self.R = dense_covariance_matrices(model)
+        self.Q, self.W, self.H, self.Z = (getattr(model, '_' + factor).copy() for factor in 'QWHZ')
+        self.S = model._S
+        self.limits = model._channel_limits
+        self.F, self.T, self.L = self.R.shape[:3]
+        self.divergence = 'IS' if isinstance(model, IS) else 'EU'
+        self.prior = 'WLP' if isinstance(model, (EU_WLP, IS_WLP)) else 'IWLP' if isinstance(
+            model, (EU_IWLP, IS_IWLP)) else None
+        if self.prior is not None:
+            self.Psi, self.nu = model._Psi, model._nu
+        if self.divergence == 'EU' and self.prior is not None:
+            self.scale, self.cost_scale = 2 / (self.F * self.T * pi * model._std ** 2), 1 / (pi * model._std ** 2)
+        else:
+            self.scale, self.cost_scale = 1 / (self.F * self.T), 1.
+        self._calculate()
+
+    def _calculate(self) -> None:
+        self.V = einsum('jk, fk, tk -> jft', self.Q, self.W, self.H)
+        self.XI = einsum('jd, dab -> jab', self.Z, self.S)
+        hatR = einsum('jft, jab -> ftab', self.V, self.XI)
+        self.A, self.B = zeros(self.R.shape, complex), zeros(self.R.shape, complex)
+        self.data_cost = 0.
+        for f, l in enumerate(self.limits):
+            R, hatR_f = self.R[f, :, :l, :l], hatR[f, :, :l, :l]
+            if self.divergence == 'EU':
+                self.A[f, :, :l, :l], self.B[f, :, :l, :l] = R, hatR_f
+                self.data_cost += (norm(R - hatR_f, axis=(-1, -2)) ** 2).sum()
+            else:
+                hatRinv = pinv(hatR_f)
+                self.A[f, :, :l, :l], self.B[f, :, :l, :l] = hatRinv @ R @ hatRinv, hatRinv
+                self.data_cost += (trace(R @ hatRinv, axis1=-1, axis2=-2) + log(det(hatR_f))).sum()
+
+    def _normalize(self) -> None:
+        self.Q *= self.Z.sum(axis=-1)[..., None]
+        self.Z /= self.Z.sum(axis=-1)[..., None]
+        self.W *= self.Q.sum(axis=0)[None]
+        self.Q /= self.Q.sum(axis=0)[None]
+        self.H *= self.W.sum(axis=0)[None]
+        self.W /= self.W.sum(axis=0)[None]
+        self._calculate()
+
+    def _traces(self, M: ndarray) -> ndarray:
+        return einsum('ftab, jab -> jft', M, self.XI).real
+
+    def iteration(self) -> None:
+        self.Q *= einsum('fk, tk, jft -> jk', self.W, self.H, self._traces(self.A)) / \
+            einsum('fk, tk, jft -> jk', self.W, self.H, self._traces(self.B))
+        self._normalize()
+        self.W *= einsum('jk, tk, jft -> fk', self.Q, self.H, self._traces(self.A)) / \
+            einsum('jk, tk, jft -> fk', self.Q, self.H, self._traces(self.B))
+        self._normalize()
+        self.H *= einsum('jk, fk, jft -> tk', self.Q, self.W, self._traces(self.A)) / \
+            einsum('jk, fk, jft -> tk', self.Q, self.W, self._traces(self.B))
+        self._normalize()
+        z_n = einsum('jft, ftab, dab -> jd', self.V, self.A, self.S).real
+        z_d = einsum('jft, ftab, dab -> jd', self.V, self.B, self.S).real
+        if self.prior is None:
+            self.Z *= z_n / z_d
+        else:
+            XIinv = pinv(self.XI)
+            trXIinvS = einsum('jab, dab -> jd', XIinv, self.S)
+            if self.prior == 'WLP':
+                trPsiinvS = einsum('jab, dab -> jd', pinv(self.Psi), self.S)
+                self.Z *= (self.scale * z_n + self.nu * trXIinvS) / (
+                    self.scale * z_d + self.L * trXIinvS + self.nu * trPsiinvS)
+            else:
+                trPsiXIinvSXIinv = trace(self.Psi[:, None] @ XIinv[:, None] @ self.S @ XIinv[:, None],
+                                         axis1=-1, axis2=-2)
+                self.Z *= (self.scale * z_n + self.nu * trPsiXIinvSXIinv) / (
+                    self.scale * z_d + self.L * trPsiXIinvSXIinv + (self.nu + self.L) * trXIinvS)
+        self._normalize()
+
+    @property
+    def cost_function(self) -> float:
+        cost = self.cost_scale * self.data_cost / (self.F * self.T)
+        if self.prior == 'WLP':
+            cost += self.nu * trace(pinv(self.Psi) @ self.XI, axis1=-2, axis2=-1).sum() + \
+                (self.L - self.nu) * log(det(self.XI)).sum()
+        elif self.prior == 'IWLP':
+            cost += (self.nu + self.L) * log(det(self.XI)).sum() + \
+                (self.nu - self.L) * trace(self.Psi @ pinv(self.XI), axis1=-2, axis2=-1).sum()
+        return cost.real
+
+
+def fail_once(model, factor: str) -> None:
+    """
+    Makes the next update of the factor raise a LinAlgError, e.g. as a singular matrix would.
+    """
+    def update() -> None:
+        delattr(model, 'update_' + factor)
+        raise LinAlgError('injected failure')
+    setattr(model, 'update_' + factor, update)
+
+
+def costs(model) -> ndarray:
+    values = [model.cost_function]
+    for _ in range(NUMBER_OF_ITERATIONS):
+        model.iteration()
+        values.append(model.cost_function)
+    return values
+
+
+@pytest.mark.parametrize('name', MODELS)
+@pytest.mark.parametrize('order_limits', [None, [0] * 3 + [1] * 5 + [2] * 8], ids=['full', 'limited'])
+def test_cost_matches_reference(name, order_limits, mixture):
+    model = build(name, mixture)
+    if order_limits is not None:
+        model.set_order_limits(order_limits)
+    reference = Reference(model)
+    assert_allclose(costs(model), costs(reference), rtol=1e-8)
+
+
+@pytest.mark.parametrize('name', list(MODELS) + list(JD_MODELS))
+def test_threads_and_packing_do_not_change_cost(name, mixture):
+    expected = costs(build(name, mixture))
+    model = build(name, mixture)
+    model.set_number_of_threads(3)
+    assert_allclose(costs(model), expected, rtol=1e-12)
+    assert_array_equal(costs(build(name, mixture, packed=False)), expected)
+
+
+@pytest.mark.parametrize('name', ['EU', 'IS'])
+def test_thread_pool_is_kept_and_not_pickled(name, mixture):
+    model = build(name, mixture)
+    model.set_number_of_threads(3)
+    model.iteration()
+    executor = model._executor
+    model.iteration()
+    assert model._executor is executor
+    unpickled = loads(dumps(model))
+    assert unpickled._executor is None
+    assert_allclose(costs(unpickled), costs(model.copy()), rtol=1e-12)
+
+
+@pytest.mark.parametrize('name', ['EU', 'IS_WLP'])
+@pytest.mark.parametrize('factors', ['Q', 'W', 'H', 'Z', 'QW', 'WH', 'QWH'])
+@pytest.mark.parametrize('coarse', [False, True], ids=['full', 'coarse'])
+def test_frozen_factors_stay_bit_identical(name, factors, coarse, mixture):
+    model = build(name, mixture)
+    model.freeze(factors)
+    frozen = {factor: getattr(model, '_' + factor).copy() for factor in factors}
+    if coarse:
+        model.fit_coarse(2, 2, 2)
+    costs(model)
+    for factor, value in frozen.items():
+        assert_array_equal(getattr(model, '_' + factor), value)
+
+
+def test_partitioned_assignment_stays_bit_identical(mixture):
+    model = build('IS', mixture)
+    model.partition_components()
+    Q = model._Q.copy()
+    costs(model)
+    assert_array_equal(model._Q, Q)
+
+
+@pytest.mark.parametrize('name', ['EU', 'IS'])
+def test_direction_refinement_does_not_grow_the_grid(name, mixture):
+    model = build(name, mixture)
+    model.set_direction_refinement(1, threshold=.01, patch_size=6)
+    numbers_of_directions = [len(model.directions)]
+    for _ in range(8):
+        model.iteration()
+        numbers_of_directions.append(len(model.directions))
+        assert model._Z.shape == (NUMBER_OF_SOURCES, numbers_of_directions[-1])
+    assert all(later <= earlier for earlier, later in zip(numbers_of_directions, numbers_of_directions[1:]))
+
+
+def test_direction_refinement_keeps_a_frozen_Z(mixture):
+    model = build('EU', mixture)
+    model.freeze('Z')
+    model.set_direction_refinement(1)
+    Z, directions = model._Z.copy(), model.directions
+    model.iteration()
+    assert_array_equal(model._Z, Z)
+    assert_array_equal(model.directions, directions)
+
+
+def dense_joint_diagonalisation_cost(model) -> float:
+    """
+    IS cost function of the model evaluated on its full channel x channel spatial covariance matrices.
+    """
+    XI = model.spatial_covariance_matrices
+    hatR = einsum('jft, jab -> ftab', model._V, XI)
+    cost = (trace(dense_covariance_matrices(model) @ pinv(hatR), axis1=-1, axis2=-2) + log(det(hatR))).sum() / (
+        model._F * model._T)
+    if isinstance(model, IS_JD_WLP):
+        cost += model._nu * trace(pinv(model._Psi) @ XI, axis1=-2, axis2=-1).sum() - \
+            (model._nu - model._L) * log(det(XI)).sum()
+    elif isinstance(model, IS_JD_IWLP):
+        cost += (model._nu + model._L) * log(det(XI)).sum() + \
+            (model._nu - model._L) * trace(model._Psi @ pinv(XI), axis1=-2, axis2=-1).sum()
+    return cost.real
+
+
+@pytest.mark.parametrize('name', JD_MODELS)
+@pytest.mark.parametrize('frozen', [False, True], ids=['U', 'frozen U'])
+def test_joint_diagonalisation_cost_decreases(name, frozen, mixture):
+    model = build(name, mixture)
+    if frozen:
+        model.freeze('U')
+    else:
+        model.unfreeze('U')
+    values = []
+    for _ in range(NUMBER_OF_ITERATIONS):
+        model.iteration()
+        values.append(model.cost_function)
+        assert_allclose(values[-1], dense_joint_diagonalisation_cost(model), rtol=1e-8)
+    assert all(later <= earlier + 1e-10 * abs(earlier) for earlier, later in zip(values, values[1:]))
+
+
+def test_schedule_keeps_the_order_of_the_joint_diagonalisation(mixture):
+    stft, _ = mixture
+    model = IS_JD(estimate_covariance_matrices(stft, packed=True), NUMBER_OF_SOURCES, COMPONENTS_PER_SOURCE,
+                  NUMBER_OF_DIRECTIONS, default_rng(1))
+    model.set_schedule(periods={'Z': 2})
+    assert model._update_order == 'QWHZU'
+    model.set_order_limits([ORDER] * len(stft[0]))
+    with pytest.raises(ValueError):
+        model.set_order_limits([ORDER - 1] * len(stft[0]))
+
+
+@pytest.mark.parametrize('name', ['EU', 'IS'])
+def test_covariance_matrices_take_half_the_dense_memory(name, mixture):
+    stft, _ = mixture
+    model = build(name, mixture)
+    assert model._R.nbytes + model._R_imag.nbytes == estimate_covariance_matrices(stft).nbytes // 2
+
+
+@pytest.mark.parametrize('name', ['EU', 'IS_WLP'])
+def test_copy_continues_like_the_original(name, mixture):
+    model = build(name, mixture)
+    model.iteration()
+    copy = model.copy()
+    assert all(getattr(copy, name) is not getattr(model, name) for name in type(model)._derived_names
+               if name in model.__dict__)
+    assert_array_equal(costs(copy), costs(model))
+
+
+@pytest.mark.parametrize('partitioned', [False, True])
+def test_pruning_keeps_a_component_per_source(partitioned, mixture):
+    model = build('EU', mixture)
+    if partitioned:
+        model.partition_components()
+    model.iteration()
+    model.prune_components(threshold=1.)
+    assert 1 <= len(model.component_indices) <= NUMBER_OF_SOURCES
+    assert (model.spectrograms.sum(axis=(1, 2)) > 0).all()
+    if partitioned:
+        assert_array_equal(model.component_indices // COMPONENTS_PER_SOURCE, arange(NUMBER_OF_SOURCES))
+    model.iteration()
+
+
+def test_partial_checkpoint_carries_the_pruned_components(mixture, tmp_path):
+    model = build('IS', mixture)
+    model.iteration()
+    model.prune_components(threshold=.2)
+    model.save_checkpoint(str(tmp_path / 'checkpoint.npz'))
+    warm_started = build('IS', mixture)
+    H = warm_started._H[:, model.component_indices]
+    warm_started.load_checkpoint(str(tmp_path / 'checkpoint.npz'), factors='QWZ')
+    assert_array_equal(warm_started.component_indices, model.component_indices)
+    assert_allclose(warm_started._Q, model._Q)
+    assert_allclose(warm_started._H, H)
+    warm_started.iteration()
+
+
+def test_resumed_fit_matches_the_uninterrupted_fit(mixture, tmp_path):
+    def interrupt(model) -> None:
+        if model.number_of_iterations == 3:
+            raise KeyboardInterrupt
+
+    checkpoint_file = str(tmp_path / 'checkpoint.npz')
+    uninterrupted = build('IS_WLP', mixture)
+    uninterrupted.fit(NUMBER_OF_ITERATIONS)
+    with pytest.raises(KeyboardInterrupt):
+        build('IS_WLP', mixture).fit(NUMBER_OF_ITERATIONS, interrupt, checkpoint_file, checkpoint_period=2)
+    resumed = build('IS_WLP', mixture)
+    resumed.load_checkpoint(checkpoint_file)
+    assert resumed.number_of_iterations == 2
+    resumed.fit(NUMBER_OF_ITERATIONS, checkpoint_file=checkpoint_file, checkpoint_period=2)
+    assert resumed.number_of_iterations == NUMBER_OF_ITERATIONS
+    assert_allclose(resumed.cost_function, uninterrupted.cost_function)
+
+
+def test_minibatch_restarts_on_the_full_grid(mixture):
+    model = build('IS', mixture)
+    model.set_minibatch(8)
+    model.set_health_check(1, maximum_restarts=2)
+    fail_once(model, 'W')
+    model.iteration()
+    assert model.number_of_iterations == 0
+    assert model._R.shape[1] == model._H.shape[0] == model._T == len(mixture[0][0, 0])
+    costs(model)
+    assert model.number_of_iterations == NUMBER_OF_ITERATIONS
+
+
+@pytest.mark.parametrize('name', ['EU', 'IS_WLP'])
+@pytest.mark.parametrize('full_batch_period', [None, 2])
+def test_minibatch_cost_decreases(name, full_batch_period, mixture):
+    model = build(name, mixture)
+    model.set_minibatch(8, full_batch_period=full_batch_period)
+    values = costs(model)
+    assert isfinite(values).all()
+    assert values[-1] < values[0]
+
+
+def test_divergence_without_restarts_names_the_factors(mixture):
+    model = build('EU', mixture)
+    model.set_health_check(1)
+    model.iteration()
+    model._W[0] = float('nan')
+    with pytest.raises(FloatingPointError, match='W'):
+        model.iteration()
+
+
+@pytest.mark.parametrize('frozen', ['Q', 'W'])
+def test_pruned_counterpart_reduces_the_frozen_factors(frozen, mixture):
+    counterpart = build('EU_WLP', mixture)
+    counterpart.iteration()
+    counterpart.prune_components(threshold=.2)
+    assert len(counterpart.component_indices) < NUMBER_OF_SOURCES * COMPONENTS_PER_SOURCE
+    model = build('IS_WLP', mixture)
+    if frozen == 'Q':
+        model.partition_components()
+    else:
+        model.freeze('W')
+    W = model._W[:, counterpart.component_indices]
+    model.initialize_from_model(counterpart)
+    assert_array_equal(model.component_indices, counterpart.component_indices)
+    if frozen == 'W':
+        assert_array_equal(model._W, W)
+    model.iteration()
+
+
+@pytest.mark.parametrize('counterpart_name, name', [('EU', 'IS'), ('EU_WLP', 'IS_WLP')])
+def test_cascade_cost_decreases(counterpart_name, name, mixture):
+    counterpart, model = build(counterpart_name, mixture), build(name, mixture)
+    values = {counterpart: [counterpart.cost_function], model: []}
+    model.fit_cascade(counterpart, NUMBER_OF_ITERATIONS, maximum_counterpart_iterations=10,
+                      callback=lambda fitted: values[fitted].append(fitted.cost_function))
+    assert len(values[model]) == model.number_of_iterations == NUMBER_OF_ITERATIONS
+    assert isfinite(values[counterpart] + values[model]).all()
+    assert values[counterpart][-1] < values[counterpart][0]
+    assert all(later <= earlier + 1e-10 * abs(earlier) for earlier, later in zip(values[model], values[model][1:]))
+
+
+def test_beamformer_initializes_the_remaining_components(mixture):
+    stft, doa = mixture
+    model = build('IS', mixture)
+    model.iteration()
+    model.prune_components(threshold=.2)
+    model.initialize_from_beamformer(stft, doa)
+    assert model._W.shape == (len(stft[0]), len(model.component_indices))
+    assert_array_equal(model._Q.argmax(axis=0), model.component_indices // COMPONENTS_PER_SOURCE)
+    model.iteration()
+
+
+@pytest.mark.parametrize('name', ['EU', 'IS'])
+def test_beamformer_initialization_cost_decreases(name, mixture):
+    stft, doa = mixture
+    model = build(name, mixture)
+    model.initialize_from_beamformer(stft, doa)
+    values = costs(model)
+    assert isfinite(values).all()
+    assert all(later <= earlier + 1e-10 * abs(earlier) for earlier, later in zip(values, values[1:]))
+
+
+def test_failed_coarse_fit_returns_to_the_full_grid(mixture):
+    model = build('IS', mixture)
+    R_shape, W_shape, H_shape = model._R.shape, model._W.shape, model._H.shape
+    fail_once(model, 'H')
+    with pytest.raises(LinAlgError):
+        model.fit_coarse(2, 2, 3)
+    assert (model._R.shape, model._W.shape, model._H.shape) == (R_shape, W_shape, H_shape)
+    assert model._V.shape[1:] == R_shape[:2]
+    model.iteration()
+
+
+@pytest.mark.parametrize('name', ['EU', 'IS'])
+def test_extrapolation_compares_with_the_current_cost(name, mixture):
+    model = build(name, mixture)
+    model.set_acceleration(extrapolation=True)
+    values = [model.cost_function]
+    for beta in [.5, .5, 100., .5, .5]:
+        model._beta = beta
+        model.iteration()
+        values.append(model.cost_function)
+        assert model._accepted_cost == values[-1]
+    assert all(later <= earlier for earlier, later in zip(values, values[1:]))
+    model.set_Z(model._Z[:, ::-1])
+    assert '_accepted_cost' not in model.__dict__
@@ -0,0 +1,16 @@
+import tracemalloc
+
+from asintf.profiling import Observer
+
+
+def test_observer_stops_only_its_own_tracing():
+    with Observer():
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
+    tracemalloc.start()
+    try:
+        with Observer():
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,40 @@
+from numpy import eye, ix_
+from numpy.random import default_rng
+from numpy.testing import assert_allclose, assert_array_equal
+
+from asintf.reconstruction import mimo_mwf, pwd, pwd_mimo_mwf
+from asintf.stft import energy_mask, estimate_covariance_matrices
+
+
+def test_pwd_mimo_mwf_matches_the_dense_filter():
+    g = default_rng(0)
+    stft = g.standard_normal((9, 8, 6)) + 1j * g.standard_normal((9, 8, 6))
+    stft[:, 2] = 0
+    stft[:, :, 4] = 0
+    steering_vectors = g.standard_normal((3, 1, 1, 9))
+    magnitudes = abs(pwd(stft, steering_vectors))
+    assert_allclose(pwd_mimo_mwf(stft, steering_vectors), mimo_mwf(stft, magnitudes[..., None, None] * eye(9)),
+                    atol=1e-12)
+
+
+def test_skipped_cells_are_filled_and_active_cells_filtered():
+    g = default_rng(0)
+    stft = g.standard_normal((4, 8, 6)) + 1j * g.standard_normal((4, 8, 6))
+    stft[:, 2] *= 1e-5
+    stft[:, :, 4] *= 1e-5
+    active_bins, active_frames = energy_mask(estimate_covariance_matrices(stft, packed=True), threshold=-40.)
+    assert_array_equal(~active_bins, [False, False, True] + [False] * 5)
+    assert_array_equal(~active_frames, [False] * 4 + [True, False])
+    for mask, dense_mask in zip((active_bins, active_frames), energy_mask(estimate_covariance_matrices(stft), -40.)):
+        assert_array_equal(mask, dense_mask)
+    factors = g.standard_normal((2, 7, 5, 4, 4)) + 1j * g.standard_normal((2, 7, 5, 4, 4))
+    compacted = factors @ factors.conj().swapaxes(-1, -2) + eye(4)
+    expected = mimo_mwf(stft[(slice(None), *ix_(active_bins, active_frames))], compacted)
+    for pass_through in (False, True):
+        source_images = mimo_mwf(stft, compacted, active_cells=(active_bins, active_frames), pass_through=pass_through)
+        assert_allclose(source_images[(slice(None), slice(None), *ix_(active_bins, active_frames))], expected)
+        for images in source_images:
+            assert_array_equal(images[:, 2], stft[:, 2] / 2 if pass_through else 0)
+            assert_array_equal(images[..., 4], stft[..., 4] / 2 if pass_through else 0)
+        if pass_through:
+            assert_allclose(source_images.sum(axis=0), stft)
@@ -0,0 +1,11 @@
+from asintf.IS import IS
+from asintf.resources import estimate_resources
+
+
+def test_tensors_are_sized_for_the_full_problem():
+    estimate = estimate_resources(IS, 40, 30, 9, 2, 3, 12, calibration_size=8, repetitions=1)
+    assert estimate['tensors']['_R'] == 40 * 30 * 45 * 8
+    assert estimate['tensors']['_R_imag'] == 40 * 30 * 36 * 8
+    assert estimate['tensors']['_hatR'] == 2 * 40 * 30 * 45 * 8
+    assert estimate['peak_bytes'] >= sum(estimate['tensors'].values())
+    assert estimate['seconds_per_iteration'] > 0
@@ -0,0 +1,26 @@
+import pytest
+from numpy import stack
+from numpy.random import default_rng
+from numpy.testing import assert_allclose, assert_array_equal
+
+from asintf.segmentation import match_permutation, segment_boundaries, separate_in_segments
+
+
+def test_silent_source_is_matched():
+    previous_source_images = default_rng(0).standard_normal((3, 4, 100))
+    source_images = previous_source_images[[2, 0, 1]]
+    source_images[1] = 0
+    assert_array_equal(match_permutation(previous_source_images, source_images), [1, 2, 0])
+
+
+@pytest.mark.parametrize('overlap', [0, 50])
+def test_segments_add_up_to_the_recording(overlap):
+    audio = default_rng(0).standard_normal((4, 1000))
+    source_images = separate_in_segments(audio, lambda segment: stack((segment, 2 * segment)), 300, overlap)
+    assert_allclose(source_images, stack((audio, 2 * audio)))
+
+
+@pytest.mark.parametrize('overlap', [-1, 300, 400])
+def test_overlap_has_to_be_shorter_than_the_segments(overlap):
+    with pytest.raises(ValueError):
+        segment_boundaries(1000, 300, overlap)
@@ -0,0 +1,63 @@
+from numpy import einsum
+from numpy.linalg import norm
+from numpy.random import default_rng
+from numpy.testing import assert_allclose, assert_array_equal
+
+from asintf.EU_WLP import EU_WLP
+from asintf.IS_WLP import IS_WLP
+from asintf.geometry import cartesian_to_spherical
+from asintf.spherical_harmonics import matrix
+from asintf.stft import estimate_covariance_matrices
+from asintf.sweep import sweep
+
+NUMBER_OF_SOURCES = 2
+COMPONENTS_PER_SOURCE = 3
+NUMBER_OF_DIRECTIONS = 12
+NUMBER_OF_ITERATIONS = 3
+CONFIGURATIONS = [{'standard_deviation': .5, 'degrees_of_freedom': 5.}, {'direct_to_reverb_ratio': 2.}]
+HYPERPARAMETERS = {'standard_deviation': 1., 'direct_to_reverb_ratio': 3., 'degrees_of_freedom': 10.}
+
+
+def build(model_class, hyperparameters):
+    g = default_rng(0)
+    doa = g.standard_normal((NUMBER_OF_SOURCES, 3))
+    doa /= norm(doa, axis=1)[:, None]
+    signals = g.standard_normal((NUMBER_OF_SOURCES, 8, 10)) + 1j * g.standard_normal((NUMBER_OF_SOURCES, 8, 10))
+    R = estimate_covariance_matrices(einsum('jl, jft -> lft', matrix(cartesian_to_spherical(doa)[:, 1:], 1), signals),
+                                     packed=True)
+    if model_class is EU_WLP:
+        return EU_WLP(R, NUMBER_OF_SOURCES, COMPONENTS_PER_SOURCE, NUMBER_OF_DIRECTIONS,
+                      hyperparameters['standard_deviation'], doa, hyperparameters['direct_to_reverb_ratio'],
+                      hyperparameters['degrees_of_freedom'], default_rng(1))
+    return IS_WLP(R, NUMBER_OF_SOURCES, COMPONENTS_PER_SOURCE, NUMBER_OF_DIRECTIONS, doa,
+                  hyperparameters['direct_to_reverb_ratio'], hyperparameters['degrees_of_freedom'], default_rng(1))
+
+
+def test_sweep_matches_fresh_models_and_leaves_the_sources_unchanged():
+    models = [build(EU_WLP, HYPERPARAMETERS), build(IS_WLP, HYPERPARAMETERS)]
+    factors = [model.factors for model in models]
+    results = sweep(models, CONFIGURATIONS, NUMBER_OF_ITERATIONS)
+    assert [(result['model'], set(result) - {'model', 'cost', 'time', 'factors'}) for result in results] == [
+        ('EU_WLP', {'standard_deviation', 'degrees_of_freedom'}), ('EU_WLP', {'direct_to_reverb_ratio'}),
+        ('IS_WLP', {'direct_to_reverb_ratio'})]
+    for result in results:
+        fresh = build(EU_WLP if result['model'] == 'EU_WLP' else IS_WLP,
+                      {name: result.get(name, value) for name, value in HYPERPARAMETERS.items()})
+        fresh.fit(NUMBER_OF_ITERATIONS)
+        assert_allclose(result['cost'], fresh.cost_function)
+        for name, value in fresh.factors.items():
+            assert_allclose(result['factors'][name], value)
+    assert models[0]._std == HYPERPARAMETERS['standard_deviation']
+    for model, model_factors in zip(models, factors):
+        assert model.number_of_iterations == 0
+        assert (model._dtrr, model._nu) == (HYPERPARAMETERS['direct_to_reverb_ratio'],
+                                            HYPERPARAMETERS['degrees_of_freedom'])
+        for name, value in model.factors.items():
+            assert_array_equal(value, model_factors[name])
+
+
+def test_workers_match_a_single_process():
+    models = [build(EU_WLP, HYPERPARAMETERS)]
+    for result, parallel_result in zip(sweep(models, CONFIGURATIONS, NUMBER_OF_ITERATIONS),
+                                       sweep(models, CONFIGURATIONS, NUMBER_OF_ITERATIONS, number_of_workers=2)):
+        assert_allclose(parallel_result['cost'], result['cost'])